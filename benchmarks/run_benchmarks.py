@@ -0,0 +1,189 @@
+"""Throughput benchmarks of the readers with synthetic inputs
+
+Usage:
+    python benchmarks/run_benchmarks.py --sites 200 --days 365 --years 5 --output results.json
+    python benchmarks/run_benchmarks.py ... --compare baseline.json --tolerance 0.2
+
+Every case runs in a fresh process, so the peak RSS belongs to that case only. Recorded are
+the time to open the reader, the time-to-first-data (open and first ts.data()), the total time
+to read all variables, rows/s (rows of all variables / total time) and the peak RSS. With
+--compare, cases slower or larger by more than the tolerance compared to an earlier output are
+reported and the exit-code is 1.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import synthetic
+
+# case -> (engine, generator, generator-arguments, reader-arguments)
+CASES = {
+    "aeronetsun_csv": (
+        "aeronetsunreader",
+        synthetic.aeronet_csv,
+        {"kind": "sun"},
+        {"fill_country_flag": False},
+    ),
+    "aeronetsun_zip": (
+        "aeronetsunreader",
+        synthetic.aeronet_zip,
+        {"kind": "sun"},
+        {"fill_country_flag": False},
+    ),
+    "aeronetsda_csv": (
+        "aeronetsdareader",
+        synthetic.aeronet_csv,
+        {"kind": "sda"},
+        {"fill_country_flag": False},
+    ),
+    "aeronetsda_tar": (
+        "aeronetsdareader",
+        synthetic.aeronet_tar,
+        {"kind": "sda"},
+        {"fill_country_flag": False},
+    ),
+    "ascii2netcdf": (
+        "ascii2netcdf",
+        synthetic.ascii2netcdf_database,
+        {},
+        {"resolution": "daily"},
+    ),
+}
+SUFFIXES = {
+    synthetic.aeronet_csv: ".csv",
+    synthetic.aeronet_zip: ".zip",
+    synthetic.aeronet_tar: ".tar.gz",
+    synthetic.ascii2netcdf_database: "",
+}
+# measures compared with --compare, larger is worse
+COMPARED = ["open_s", "first_data_s", "total_s", "peak_rss_mb"]
+
+
+def generate(case: str, directory: str, sites: int, days: int, years: int) -> str:
+    """input of a case, reused if already generated with the same size"""
+    _, generator, kwargs, _ = CASES[case]
+    name = "_".join([generator.__name__, *kwargs.values(), f"{sites}x{days}x{years}"])
+    path = os.path.join(directory, name + SUFFIXES[generator])
+    if not os.path.exists(path):
+        generator(path, sites=sites, days=days, years=years, **kwargs)
+    return path
+
+
+def measure(case: str, path: str) -> dict:
+    """run a case in this process"""
+    import pyaro
+
+    engine, _, _, reader_kwargs = CASES[case]
+    start = time.perf_counter()
+    with pyaro.open_timeseries(engine, path, filters=[], **reader_kwargs) as ts:
+        opened = time.perf_counter()
+        variables = ts.variables()
+        rows = len(ts.data(variables[0]))
+        first_data = time.perf_counter()
+        for var in variables[1:]:
+            rows += len(ts.data(var))
+    end = time.perf_counter()
+    return {
+        "case": case,
+        "engine": engine,
+        "rows": rows,
+        "open_s": opened - start,
+        "first_data_s": first_data - start,
+        "total_s": end - start,
+        "rows_per_s": rows / (end - start),
+        # ru_maxrss is in kB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def run(case: str, path: str) -> dict:
+    """run a case in a fresh process"""
+    out = subprocess.run(
+        [sys.executable, __file__, "--measure", case, path],
+        check=True,
+        stdout=subprocess.PIPE,
+        text=True,
+    ).stdout
+    return json.loads(out.splitlines()[-1])
+
+
+def compare(results: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    """regressions of results compared to baseline"""
+    base = {res["case"]: res for res in baseline}
+    regressions = []
+    for res in results:
+        if res["case"] not in base:
+            continue
+        for key in COMPARED:
+            old, new = base[res["case"]][key], res[key]
+            if new > old * (1 + tolerance):
+                regressions.append(f"{res['case']}: {key} {old:.3f} -> {new:.3f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sites", type=int, default=100)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--years", type=int, default=2)
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument(
+        "--data-dir", help="directory for the generated input, kept for reuse"
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="best of N runs")
+    parser.add_argument("--output", help="write the results as json")
+    parser.add_argument("--compare", help="results of an earlier run as json")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--measure", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(*args.measure)))
+        return 0
+
+    tmpdir = None
+    data_dir = args.data_dir
+    if data_dir is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        data_dir = tmpdir.name
+    os.makedirs(data_dir, exist_ok=True)
+    results = []
+    print(
+        f"{'case':16s} {'rows':>10s} {'open[s]':>8s} {'first[s]':>8s} {'total[s]':>8s}"
+        f" {'rows/s':>10s} {'rss[MB]':>8s}"
+    )
+    for case in args.cases:
+        path = generate(case, data_dir, args.sites, args.days, args.years)
+        res = min(
+            (run(case, path) for _ in range(args.repeat)), key=lambda r: r["total_s"]
+        )
+        res.update(sites=args.sites, days=args.days, years=args.years)
+        results.append(res)
+        print(
+            f"{case:16s} {res['rows']:10d} {res['open_s']:8.3f} {res['first_data_s']:8.3f}"
+            f" {res['total_s']:8.3f} {res['rows_per_s']:10.0f} {res['peak_rss_mb']:8.1f}"
+        )
+    if tmpdir is not None:
+        tmpdir.cleanup()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as fh:
+            regressions = compare(results, json.load(fh), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""Generators of synthetic input data of configurable size for the benchmarks
+
+The sizes are given as number of sites (stations), days per year and years. The headers of the
+Aeronet files are taken from the test-data, the data-lines and the Ascii2Netcdf databases are
+random, with about 10% missing values.
+"""
+
+import datetime
+import io
+import os
+import tarfile
+import zipfile
+
+import netCDF4
+import numpy as np
+
+TESTDATA = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), "..", "tests", "testdata"
+)
+AERONET_TEMPLATES = {
+    "sun": os.path.join(TESTDATA, "aeronetsun_testdata_small.csv"),
+    "sda": os.path.join(TESTDATA, "aeronetsda_testdata.csv"),
+}
+AERONET_HEADER_LINES = 7
+START_YEAR = 2000
+
+
+def _aeronet_header(kind: str) -> list[str]:
+    with open(AERONET_TEMPLATES[kind], "r", encoding="utf-8") as fh:
+        return [next(fh) for _ in range(AERONET_HEADER_LINES)]
+
+
+def _site_names(sites: int) -> list[str]:
+    return [f"Site_{i:05d}" for i in range(sites)]
+
+
+def _aeronet_site_lines(fields, site, rng, days, years):
+    """data-lines of a single site"""
+    lat, lon, alt = rng.uniform(-80, 80), rng.uniform(-180, 180), rng.uniform(0, 3000)
+    values = rng.uniform(0, 2, size=(days * years, len(fields)))
+    values[rng.random(values.shape) < 0.1] = -999.0
+    fixed = {
+        "Data_Quality_Level": "lev20",
+        "AERONET_Instrument_Number": "3",
+        "AERONET_Site_Name": site,
+        "Site_Latitude(Degrees)": f"{lat:.6f}",
+        "Site_Longitude(Degrees)": f"{lon:.6f}",
+        "Site_Elevation(m)": f"{alt:.6f}",
+    }
+    lines = []
+    row = 0
+    for year in range(START_YEAR, START_YEAR + years):
+        first = datetime.date(year, 1, 1)
+        for day in range(days):
+            date = first + datetime.timedelta(days=day)
+            cols = []
+            for i, field in enumerate(fields):
+                if i == 0:
+                    cols.append(site)
+                elif field.startswith("Date"):
+                    cols.append(date.strftime("%d:%m:%Y"))
+                elif field.startswith("Time"):
+                    cols.append("12:00:00")
+                elif field == "Day_of_Year":
+                    cols.append(str(day + 1))
+                elif field in fixed:
+                    cols.append(fixed[field])
+                else:
+                    cols.append(f"{values[row, i]:.6f}")
+            lines.append(",".join(cols) + "\n")
+            row += 1
+    return lines
+
+
+def _aeronet_sites(kind: str, sites: int, days: int, years: int, seed: int):
+    """yield header and data-lines per site"""
+    header = _aeronet_header(kind)
+    fields = header[-1].strip().split(",")
+    rng = np.random.default_rng(seed)
+    for site in _site_names(sites):
+        yield site, header, _aeronet_site_lines(fields, site, rng, days, years)
+
+
+def aeronet_csv(
+    path: str, kind: str, sites: int, days: int, years: int, seed: int = 1
+) -> str:
+    """write an Aeronet file with all sites, like the Aeronet all-sites downloads
+
+    :param kind: "sun" or "sda"
+    :return: path
+    """
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.writelines(_aeronet_header(kind))
+        for _, _, lines in _aeronet_sites(kind, sites, days, years, seed):
+            fh.writelines(lines)
+    return path
+
+
+def aeronet_zip(
+    path: str, kind: str, sites: int, days: int, years: int, seed: int = 1
+) -> str:
+    """write a zip-file containing a single aeronet_csv"""
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        with zf.open(f"{kind}.csv", "w") as fh:
+            fh.write("".join(_aeronet_header(kind)).encode("utf-8"))
+            for _, _, lines in _aeronet_sites(kind, sites, days, years, seed):
+                fh.write("".join(lines).encode("utf-8"))
+    return path
+
+
+def aeronet_tar(
+    path: str, kind: str, sites: int, days: int, years: int, seed: int = 1
+) -> str:
+    """write a tar.gz-file with one file per site, like the Aeronet SDA tar downloads"""
+    with tarfile.open(path, "w:gz") as tf:
+        for site, header, lines in _aeronet_sites(kind, sites, days, years, seed):
+            content = "".join(header + lines).encode("utf-8")
+            info = tarfile.TarInfo(f"{kind.upper()}/{site}.ONEILL_lev20")
+            info.size = len(content)
+            tf.addfile(info, io.BytesIO(content))
+    return path
+
+
+def ascii2netcdf_database(
+    directory: str,
+    sites: int,
+    days: int,
+    years: int,
+    components: int = 3,
+    seed: int = 1,
+) -> str:
+    """write a StationList.csv and daily yearly data-files
+
+    :param components: number of variables per file
+    :return: directory
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    codes = [f"XX{i:04d}" for i in range(sites)]
+    with open(os.path.join(directory, "StationList.csv"), "w", encoding="utf-8") as fh:
+        fh.write(
+            "#StationName\turban/suburban/rural\tCountryName\tISO2\tLatitude (degrees)"
+            "\tLongitude (degrees)\tAltitude (m.a.s.l.)\tLocationCode\n"
+        )
+        for code in codes:
+            lat, lon = rng.uniform(-80, 80), rng.uniform(-180, 180)
+            alt = rng.uniform(0, 3000)
+            fh.write(f"Station {code}\trural\t\tXX\t{lat}\t{lon}\t{alt}\t{code}\n")
+    for year in range(START_YEAR, START_YEAR + years):
+        file = os.path.join(directory, f"data_daily.{year}.nc")
+        with netCDF4.Dataset(file, "w") as nc:
+            nc.createDimension("time", days)
+            nc.createDimension("station", sites)
+            nc.createDimension("strlen", 8)
+            time = nc.createVariable("time", "f8", ("time",))
+            time.units = f"days since {year}-01-01 00:00:00"
+            time[:] = np.arange(days)
+            station = nc.createVariable("station", "S1", ("station", "strlen"))
+            station[:] = np.array(codes, dtype="S8").view("S1").reshape(sites, 8)
+            for i in range(components):
+                var = nc.createVariable(
+                    f"EPDL{i:03d}", "f4", ("station", "time"), fill_value=-9999.0
+                )
+                var.component = f"component_{i}"
+                var.matrix = "air"
+                var.units = "ug"
+                vals = (rng.random((sites, days)) * 10).astype("f4")
+                vals[rng.random(vals.shape) < 0.1] = -9999.0
+                var[:] = vals
+    return directory
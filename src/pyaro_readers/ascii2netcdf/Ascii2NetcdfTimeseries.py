@@ -1,8 +1,16 @@
 import csv
+import functools
 import glob
+import hashlib
 import inspect
+import json
 import logging
 import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 import netCDF4
 import numpy as np
 from pyaro.timeseries import (
@@ -14,13 +22,233 @@ from pyaro.timeseries import (
 )
 import pyaro.timeseries.Filter
 
+from ..utils.aggregation import METHODS, PERIODS, aggregate
+from ..utils.asynchronous import open_async
+from ..utils.cache import user_cache_dir
+from ..utils.data import compact_data, station_table
+from ..utils.stats import (
+    AGGREGATE,
+    ASSEMBLE,
+    BYTES_READ,
+    NETCDF_OPEN,
+    NETCDF_READ,
+    ROWS,
+    ReaderStats,
+    apply_filters,
+)
+
 logger = logging.getLogger(__name__)
 
+# increase when the layout of the index-files changes
+INDEX_VERSION = 1
+
+# station-rows less than this apart are read in a single hyperslab
+COALESCE_GAP = 8
+# the netcdf-C library, and usually the HDF5 library below, are not thread-safe
+_NETCDF_LOCK = threading.Lock()
+
+# number of files with decoded time- and station-axes kept in memory, see _get_axes
+AXIS_CACHE_SIZE = 64
+_AXIS_CACHE = OrderedDict()  # (file, mtime) -> _Axes
+_AXIS_CACHE_LOCK = threading.Lock()
+
 
 class Ascii2NetcdfTimeseriesReaderException(Exception):
     pass
 
 
+def _index_groups(rows: np.ndarray, max_gap: int = COALESCE_GAP):
+    """group sorted indices to slices, indices less than max_gap apart share a slice
+
+    :return: list of (start, stop)
+    """
+    if len(rows) == 0:
+        return []
+    splits = np.flatnonzero(np.diff(rows) > max_gap) + 1
+    return [(group[0], group[-1] + 1) for group in np.split(rows, splits)]
+
+
+class _Axes:
+    """decoded time- and station-axes of a data-file"""
+
+    def __init__(self, nc):
+        times = nc["time"]
+        # python datetimes where possible, cftime-dates otherwise, e.g. for reference dates
+        # before the gregorian reform; numpy converts both
+        start_times = np.array(
+            netCDF4.num2date(times[:], times.units, only_use_cftime_datetimes=False),
+            dtype="datetime64[s]",
+        )
+        self.start_times = start_times
+        self.end_times = start_times + (start_times[1] - start_times[0])
+        self.stations = netCDF4.chartostring(nc["station"][:])
+        # (names, lats) as bytes -> (station-rows, index into coordinates), see station_rows
+        self._rows = {}
+
+    def station_rows(self, names, lats):
+        """rows of the stations with known coordinates and their position in names"""
+        key = (names.tobytes(), lats.tobytes())
+        if key not in self._rows:
+            pos = np.searchsorted(names, self.stations).clip(max=len(names) - 1)
+            rows = np.flatnonzero(
+                (names[pos] == self.stations) & np.isfinite(lats[pos])
+            )
+            if len(self._rows) >= AXIS_CACHE_SIZE:
+                self._rows.clear()
+            self._rows[key] = (rows, pos[rows])
+        return self._rows[key]
+
+
+def _get_axes(file, nc) -> _Axes:
+    """axes of an open data-file, cached per file and modification time"""
+    key = (file, os.stat(file).st_mtime_ns)
+    with _AXIS_CACHE_LOCK:
+        if key in _AXIS_CACHE:
+            _AXIS_CACHE.move_to_end(key)
+            return _AXIS_CACHE[key]
+    axes = _Axes(nc)
+    with _AXIS_CACHE_LOCK:
+        _AXIS_CACHE[key] = axes
+        while len(_AXIS_CACHE) > AXIS_CACHE_SIZE:
+            _AXIS_CACHE.popitem(last=False)
+    return axes
+
+
+def _read_ncfile(file, variables, coordinates, time_bounds=None, compact=False):
+    """read variables of a data-file into flat arrays, one row per station and time
+
+    The file is opened once for all variables; the time- and station-axes are taken from
+    the axis-cache and broadcast once and shared by all variables. Only the hyperslabs of
+    the file covering the requested stations and time_bounds are read. Module-level
+    function to be usable in a process pool.
+
+    :param file: data-file
+    :param variables: dict of variable name -> (variable name in the file, expected units)
+    :param coordinates: tuple of sorted names, latitudes, longitudes and altitudes
+        of the stations to read, see Ascii2NetcdfTimeseriesReader._station_coordinates
+    :param time_bounds: tuple of earliest start and latest end as datetime, None for all times
+    :param compact: return station_ids, the index into coordinates, instead of stations,
+        lats, lons and alts
+    :return: tuple of the result and the timings and counters as ReaderStats.as_dict();
+        the result is a dict of variable name -> dict with data, stations, lats, lons, alts,
+        start_times, end_times and flags; variables not in the file are missing
+    """
+    stats = ReaderStats()
+    (names, lats, lons, alts) = coordinates
+    if len(names) == 0:
+        return {}, stats.as_dict()
+    vdatas = {}
+    with _NETCDF_LOCK:
+        with stats.phase(NETCDF_OPEN):
+            nc = netCDF4.Dataset(file, "r")
+        with nc:
+            with stats.phase(NETCDF_OPEN):
+                variables = {
+                    varname: (epdl, units)
+                    for varname, (epdl, units) in variables.items()
+                    if epdl in nc.variables
+                }
+                if not variables:
+                    return {}, stats.as_dict()
+                axes = _get_axes(file, nc)
+                rows, pos = axes.station_rows(names, lats)
+            tslice = slice(0, len(axes.start_times))
+            if time_bounds is not None:
+                start, end = (np.datetime64(t, "s") for t in time_bounds)
+                tidx = np.flatnonzero(
+                    (axes.end_times >= start) & (axes.start_times <= end)
+                )
+                tslice = slice(tidx[0], tidx[-1] + 1) if len(tidx) else slice(0, 0)
+            if len(rows) == 0 or tslice.stop <= tslice.start:
+                return {}, stats.as_dict()
+            for varname, (epdl, units) in variables.items():
+                var = nc[epdl]
+                if var.units != units:
+                    logger.warning(
+                        f"units-change for {varname} in {file}: {var.units} != {units}"
+                    )
+                blocks = []
+                for rstart, rstop in _index_groups(rows):
+                    with stats.phase(NETCDF_READ):
+                        block = np.ma.filled(var[rstart:rstop, tslice], np.nan)
+                    stats.count(BYTES_READ, block.nbytes)
+                    # drop the rows read only to coalesce the slices
+                    blocks.append(
+                        block[rows[(rows >= rstart) & (rows < rstop)] - rstart]
+                    )
+                vdatas[varname] = np.concatenate(blocks, axis=0)
+    with stats.phase(ASSEMBLE):
+        result = _flatten(vdatas, axes, tslice, rows, pos, coordinates, compact)
+    for dstruct in result.values():
+        stats.count(ROWS, len(dstruct["data"]))
+    return result, stats.as_dict()
+
+
+def _flatten(vdatas, axes, tslice, rows, pos, coordinates, compact):
+    """flat arrays of the [station][time] arrays read in _read_ncfile, without missing values"""
+    (names, lats, lons, alts) = coordinates
+    start_times = axes.start_times[tslice]
+    end_times = axes.end_times[tslice]
+
+    # get all arrays into same size, time fastes moving, i.e. [station][time]
+    shape = (len(rows), len(start_times))
+    broadcast = {}
+    broadcast["start_times"] = np.tile(start_times, shape[0])
+    broadcast["end_times"] = np.tile(end_times, shape[0])
+    if compact:
+        broadcast["station_ids"] = np.repeat(pos, shape[1])
+    else:
+        broadcast["stations"] = np.repeat(names[pos], shape[1])
+        broadcast["lats"] = np.repeat(lats[pos], shape[1])
+        broadcast["lons"] = np.repeat(lons[pos], shape[1])
+        broadcast["alts"] = np.repeat(alts[pos], shape[1])
+
+    result = {}
+    for varname, vdata in vdatas.items():
+        dstruct = {}
+        dstruct["data"] = vdata.flatten()
+        # filter out undefined data
+        idx = np.isfinite(dstruct["data"])
+        dstruct["data"] = dstruct["data"][idx]
+        for key, axis in broadcast.items():
+            dstruct[key] = axis[idx]
+
+        dstruct["flags"] = dstruct["data"].astype("i4")
+        dstruct["flags"][:] = Flag.VALID
+        result[varname] = dstruct
+    return result
+
+
+def _joined(results):
+    """join the results of _read_ncfile of several files to a single result"""
+    dstructs = {}
+    for result in results:
+        for varname, dstruct in result.items():
+            dstructs.setdefault(varname, []).append(dstruct)
+    return {
+        varname: {key: np.concatenate([d[key] for d in ds]) for key in ds[0]}
+        for varname, ds in dstructs.items()
+    }
+
+
+def _aggregated(dstruct, aggregation, compact):
+    """aggregate the flat arrays of a variable to periods"""
+    key = "station_ids" if compact else "stations"
+    first, start_times, end_times, values, stds = aggregate(
+        dstruct[key],
+        dstruct["start_times"],
+        dstruct["end_times"],
+        dstruct["data"],
+        *aggregation,
+    )
+    result = {name: column[first] for name, column in dstruct.items()}
+    result["data"] = values
+    result["start_times"] = start_times
+    result["end_times"] = end_times
+    result["standard_deviations"] = stds
+    return result
+
+
 class Ascii2NetcdfTimeseriesReader(AutoFilterReaderEngine.AutoFilterReader):
     RESOLUTIONS = {
         60 * 60: "hourly",
@@ -29,12 +257,20 @@ class Ascii2NetcdfTimeseriesReader(AutoFilterReaderEngine.AutoFilterReader):
         60 * 60 * 24 * 28: "monthly",
         60 * 60 * 24 * 365: "yearly",
     }
+    EXECUTORS = {"process": ProcessPoolExecutor, "thread": ThreadPoolExecutor}
 
     def __init__(
         self,
         filename,
         resolution="daily",
         filters=[],
+        max_workers: int = 1,
+        executor: str = "process",
+        compact: bool = False,
+        aggregate: [str, None] = None,
+        aggregate_method: str = "mean",
+        index_in_data_dir: bool = False,
+        stats_callback=None,
     ):
         """Initialize/open a new reader for netcdf-files converted from EBAS NASA-Ames-files
         with niluNasaAmes2netcdf.pl.
@@ -45,8 +281,40 @@ class Ascii2NetcdfTimeseriesReader(AutoFilterReaderEngine.AutoFilterReader):
             The resolutions are already merged in the conversion from ascii to netcdf, e.g. daily
             contains the accumulated hourly data, too.
         :param filters: list of filters, defaults to []
+        :param max_workers: number of yearly files read in parallel, defaults to 1 (sequential)
+        :param executor: "process" or "thread"; netcdf-access is serialized between threads
+            since netcdf/HDF5 are not thread-safe, so only processes read files concurrently,
+            threads overlap just the conversion of the data
+        :param compact: return DataStationIdStructured with per-row station-ids and the station
+            names and coordinates stored once, instead of NpStructuredData
+        :param aggregate: aggregate the rows of each station to the periods "daily", "monthly"
+            or "yearly" while reading, see utils.aggregation; None keeps the resolution
+        :param aggregate_method: "mean", "median" or "count" of the valid values of a period
+        :param index_in_data_dir: write the updated index-file as hidden sidecar into the
+            directory, e.g. to share it with all users of the database; by default it is
+            written to the user cache, an existing sidecar is read in both cases
+        :param stats_callback: function(kind, name, value) following the timings and counters
+            collected in the stats attribute, see utils.stats
         """
         self._set_filters(filters)
+        # timings and counters of the ingest
+        self.stats = ReaderStats(stats_callback)
+        if executor not in self.EXECUTORS:
+            raise Ascii2NetcdfTimeseriesReaderException(
+                f"unknown executor: {executor}, use one of {list(self.EXECUTORS)}"
+            )
+        self._executor = executor
+        self._max_workers = max_workers
+        self._compact = compact
+        self._index_in_data_dir = index_in_data_dir
+        self._aggregation = None
+        if aggregate is not None:
+            if aggregate not in PERIODS or aggregate_method not in METHODS:
+                raise Ascii2NetcdfTimeseriesReaderException(
+                    f"unknown aggregation {aggregate}/{aggregate_method}, use one of "
+                    f"{list(PERIODS)} and {METHODS}"
+                )
+            self._aggregation = (aggregate, aggregate_method)
         if os.path.isdir(filename):
             self._directory = filename
         else:
@@ -68,6 +336,7 @@ class Ascii2NetcdfTimeseriesReader(AutoFilterReaderEngine.AutoFilterReader):
             if self._is_year_in_filters(year):
                 self._years.add(year)
 
+        self._index = self._read_index()
         self._variables = self._read_file_variables()
         station_file = "StationList.csv"
         station_filepath = os.path.join(self._directory, station_file)
@@ -85,43 +354,146 @@ class Ascii2NetcdfTimeseriesReader(AutoFilterReaderEngine.AutoFilterReader):
                 )
         return
 
-    def _is_year_in_filters(self, year):
-        start_year = np.datetime64(f"{year}-01-01 00:00:00")
-        end_year = np.datetime64(f"{year}-12-31 23:59:59")
+    def _time_envelope(self):
+        """earliest and latest time of the TimeBoundsFilter, None if not restricted"""
         time_filter = pyaro.timeseries.Filter.TimeBoundsFilter()
         for fil in self._get_filters():
             if isinstance(fil, pyaro.timeseries.Filter.TimeBoundsFilter):
                 time_filter = fil
         if time_filter.has_envelope():
-            start, end = time_filter.envelope()
+            return time_filter.envelope()
+        return None
+
+    def _is_year_in_filters(self, year):
+        start_year = np.datetime64(f"{year}-01-01 00:00:00")
+        end_year = np.datetime64(f"{year}-12-31 23:59:59")
+        envelope = self._time_envelope()
+        if envelope is not None:
+            start, end = envelope
             if end_year < start:
                 return False
             if end < start_year:
                 return False
         return True
 
-    def _read_file_variables(self):
-        variables = {}
-        for year in self._years:
-            file = os.path.join(self._directory, f"data_{self._resolution}.{year}.nc")
+    def _index_files(self):
+        """candidate locations of the index-file: a sidecar in the directory, or the user cache"""
+        name = f".pyaro_index_{self._resolution}.json"
+        dir_hash = hashlib.sha256(
+            os.path.realpath(self._directory).encode("utf-8")
+        ).hexdigest()
+        return [
+            os.path.join(self._directory, name),
+            os.path.join(user_cache_dir(), "ascii2netcdf", f"{dir_hash}{name}"),
+        ]
+
+    def _read_index(self):
+        """metadata of the data-files of the selected years, read from the index-file
+
+        The newest valid index-file of the candidate locations is used: a sidecar left from
+        before the directory became read-only is older than the index written to the user
+        cache since. Files not in the index or with changed modification time or size are
+        opened and their entries refreshed, the updated index is written back.
+
+        :return: dict of year -> metadata of the file, see _file_metadata
+        """
+        index = {}
+        index_mtime = None
+        for index_file in self._index_files():
+            if os.path.exists(index_file):
+                try:
+                    mtime = os.stat(index_file).st_mtime_ns
+                    with open(index_file, "r", encoding="utf-8") as fh:
+                        content = json.load(fh)
+                    if content.get("version") == INDEX_VERSION and (
+                        index_mtime is None or mtime > index_mtime
+                    ):
+                        index = content["files"]
+                        index_mtime = mtime
+                except (OSError, ValueError, KeyError) as ex:
+                    logger.warning(f"ignoring broken index-file {index_file}: {ex}")
+
+        metadata = {}
+        changed = False
+        for year in sorted(self._years):
+            basename = f"data_{self._resolution}.{year}.nc"
+            file = os.path.join(self._directory, basename)
             if not os.path.exists(file):
                 logger.info(
                     f"no datafile for {year} and {self._resolution} at {file}, skipping..."
                 )
                 continue
-            with netCDF4.Dataset(file, "r") as nc:
-                for vname, var in nc.variables.items():
-                    if vname.startswith("EPDL"):
-                        varname = f"{var.component}_in_{var.matrix}"
-                        units = "1"
-                        if "units" in var.ncattrs():
-                            units = var.units
-                        if varname in variables:
-                            if units != variables[varname][1]:
-                                logger.warning(
-                                    f"units changed from {variables[varname][1]} to {units} for {varname}/{vname} in {file}"
-                                )
-                        variables[varname] = (vname, units)
+            st = os.stat(file)
+            entry = index.get(basename)
+            if (
+                entry is None
+                or entry["mtime_ns"] != st.st_mtime_ns
+                or entry["size"] != st.st_size
+            ):
+                entry = self._file_metadata(file)
+                entry["mtime_ns"] = st.st_mtime_ns
+                entry["size"] = st.st_size
+                index[basename] = entry
+                changed = True
+            metadata[year] = entry
+        if changed:
+            self._write_index(index)
+        return metadata
+
+    def _write_index(self, index):
+        """write the index to the sidecar if index_in_data_dir, else or if that fails to the cache"""
+        content = {"version": INDEX_VERSION, "files": index}
+        index_files = self._index_files()
+        if not self._index_in_data_dir:
+            index_files = index_files[1:]
+        for index_file in index_files:
+            try:
+                os.makedirs(os.path.dirname(index_file), exist_ok=True)
+                fd, tmp = tempfile.mkstemp(
+                    dir=os.path.dirname(index_file), suffix=".tmp"
+                )
+                with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                    json.dump(content, fh)
+                os.replace(tmp, index_file)
+                return
+            except OSError as ex:
+                logger.info(f"cannot write index-file {index_file}: {ex}")
+
+    def _file_metadata(self, file):
+        """variables, stations and time-coverage of a data-file
+
+        :return: dict with variables (EPDL-name -> (varname, units)), stations and
+            time (first and last time as isoformat)
+        """
+        with netCDF4.Dataset(file, "r") as nc:
+            variables = {}
+            for vname, var in nc.variables.items():
+                if vname.startswith("EPDL"):
+                    varname = f"{var.component}_in_{var.matrix}"
+                    units = "1"
+                    if "units" in var.ncattrs():
+                        units = var.units
+                    variables[vname] = (varname, units)
+            stations = netCDF4.chartostring(nc["station"][:]).tolist()
+            times = nc["time"]
+            time = []
+            if len(times) > 0:
+                time = [
+                    netCDF4.num2date(times[i], times.units).isoformat() for i in (0, -1)
+                ]
+        return {"variables": variables, "stations": stations, "time": time}
+
+    def _read_file_variables(self):
+        variables = {}
+        for year, metadata in self._index.items():
+            file = os.path.join(self._directory, f"data_{self._resolution}.{year}.nc")
+            for vname, (varname, units) in metadata["variables"].items():
+                if varname in variables:
+                    if units != variables[varname][1]:
+                        logger.warning(
+                            f"units changed from {variables[varname][1]} to {units} for {varname}/{vname} in {file}"
+                        )
+                variables[varname] = (vname, units)
         return variables
 
     def _read_station_list(self, file):
@@ -154,85 +526,145 @@ class Ascii2NetcdfTimeseriesReader(AutoFilterReaderEngine.AutoFilterReader):
                     )
         return stations
 
-    def _get_data_from_ncfile(self, varname, file, data):
-        with netCDF4.Dataset(file, "r") as nc:
-            start_times = netCDF4.num2date(nc["time"][:], nc["time"].units)
-            end_times = start_times + (start_times[1] - start_times[0])
-            stations = nc["station"][:]
-            (epdl, _) = self._variables[varname]
-            if not epdl in nc.variables:
-                return
-            vdata = np.ma.filled(nc[epdl][:], np.nan)
-            if nc[epdl].units != data.units:
-                logger.warning(
-                    f"units-change for {varname} in {file}: {nc[epdl].units} != {data.units}"
+    def _station_coordinates(self):
+        """sorted names and coordinates of the (filtered) stations as numpy arrays
+
+        :return: tuple of names, latitudes, longitudes, altitudes
+        """
+        stations = self.stations()
+        names = np.array(sorted(stations.keys()), dtype=str)
+        lats = np.array([stations[name].latitude for name in names], dtype=float)
+        lons = np.array([stations[name].longitude for name in names], dtype=float)
+        alts = np.array([stations[name].altitude for name in names], dtype=float)
+        return (names, lats, lons, alts)
+
+    def _unfiltered_data_many(self, varnames: list[str]) -> dict[str, Data]:
+        """read several variables in a single pass over the files, see data_many"""
+        datas = {}
+        for varname in varnames:
+            (_, units) = self._variables[varname]
+            datas[varname] = NpStructuredData(varname, units)
+
+        files = []
+        file_variables = []
+        for year, metadata in self._index.items():
+            variables = {
+                varname: self._variables[varname]
+                for varname in varnames
+                if self._variables[varname][0] in metadata["variables"]
+            }
+            if variables:
+                # files without the variables are not opened
+                files.append(
+                    os.path.join(self._directory, f"data_{self._resolution}.{year}.nc")
                 )
+                file_variables.append(variables)
+        coordinates = self._station_coordinates()
+        read_file = functools.partial(
+            _read_ncfile,
+            coordinates=coordinates,
+            time_bounds=self._time_envelope(),
+            compact=self._compact,
+        )
+        if self._max_workers > 1 and len(files) > 1:
+            pool = self.EXECUTORS[self._executor]
+            with pool(max_workers=min(self._max_workers, len(files))) as executor:
+                # map keeps the order of the years
+                results = list(executor.map(read_file, files, file_variables))
+        else:
+            results = list(map(read_file, files, file_variables))
+        for _, file_stats in results:
+            self.stats.merge(file_stats)
+        results = [result for result, _ in results]
+        if self._aggregation is not None:
+            # periods may span the files of two years, e.g. the last week of a year
+            with self.stats.phase(AGGREGATE):
+                results = [
+                    {
+                        varname: _aggregated(dstruct, self._aggregation, self._compact)
+                        for varname, dstruct in _joined(results).items()
+                    }
+                ]
 
-            # get all arrays into same size, time fastes moving, i.e. [station][time]
-            dstruct = {}
-            dstruct["start_times"] = np.tile(start_times, vdata.shape[0])
-            dstruct["end_times"] = np.tile(end_times, vdata.shape[0])
-            lats = []
-            lons = []
-            alts = []
-            stats = []
-            for i in range(stations.shape[0]):
-                station = str(netCDF4.chartostring(stations[i]))
-                if not station in self.stations():
-                    lats.append(np.nan)
-                    lons.append(np.nan)
-                    alts.append(np.nan)
-                    stats.append(station)
-                else:
-                    stat = self._stations[station]
-                    lats.append(stat.latitude)
-                    lons.append(stat.longitude)
-                    alts.append(stat.altitude)
-                    stats.append(station)
-            lat = np.array(lats)
-            lon = np.array(lons)
-            alt = np.array(alts)
-            dstruct["stations"] = np.repeat(stats, vdata.shape[1])
-            dstruct["lats"] = np.repeat(lat, vdata.shape[1])
-            dstruct["lons"] = np.repeat(lon, vdata.shape[1])
-            dstruct["alts"] = np.repeat(alt, vdata.shape[1])
-            dstruct["data"] = vdata.flatten()
-
-            # filter out undefined data or stations
-            idx = np.isfinite(dstruct["data"]) & np.isfinite(dstruct["lats"])
-            for key in dstruct.keys():
-                dstruct[key] = dstruct[key][idx]
-
-            dstruct["flags"] = dstruct["data"].astype("i4")
-            dstruct["flags"][:] = Flag.VALID
-
-            data.append(
-                dstruct["data"],
-                dstruct["stations"],
-                dstruct["lats"],
-                dstruct["lons"],
-                dstruct["alts"],
-                dstruct["start_times"],
-                dstruct["end_times"],
-                dstruct["flags"],
-                dstruct["data"] * np.nan,
+        if self._compact:
+            return self._compact_data(varnames, results, coordinates)
+        for result in results:
+            for varname, dstruct in result.items():
+                datas[varname].append(
+                    dstruct["data"],
+                    dstruct["stations"],
+                    dstruct["lats"],
+                    dstruct["lons"],
+                    dstruct["alts"],
+                    dstruct["start_times"],
+                    dstruct["end_times"],
+                    dstruct["flags"],
+                    dstruct.get("standard_deviations", dstruct["data"] * np.nan),
+                )
+        return datas
+
+    def _compact_data(self, varnames, results, coordinates) -> dict[str, Data]:
+        """join the results of _read_ncfile with compact=True to DataStationIdStructured"""
+        table = station_table(*coordinates)
+        columns = {varname: [] for varname in varnames}
+        for result in results:
+            for varname, dstruct in result.items():
+                columns[varname].append(dstruct)
+        datas = {}
+        for varname, dstructs in columns.items():
+            (_, units) = self._variables[varname]
+
+            def join(key, dtype):
+                return np.concatenate(
+                    [dstruct[key] for dstruct in dstructs] + [np.empty(0, dtype=dtype)]
+                )
+
+            values = join("data", "f")
+            if self._aggregation is not None:
+                stds = join("standard_deviations", "f")
+            else:
+                stds = values * np.nan
+            datas[varname] = compact_data(
+                varname,
+                units,
+                values,
+                join("station_ids", "u4"),
+                table,
+                join("start_times", "datetime64[s]"),
+                join("end_times", "datetime64[s]"),
+                join("flags", "i2"),
+                stds,
             )
-            return
+        return datas
 
     def _unfiltered_data(self, varname) -> Data:
-        (_, units) = self._variables[varname]
-        data = NpStructuredData(varname, units)
+        return self._unfiltered_data_many([varname])[varname]
 
-        for year in self._years:
-            file = os.path.join(self._directory, f"data_{self._resolution}.{year}.nc")
-            if not os.path.exists(file):
-                logger.info(
-                    f"no datafile for {year} and {self._resolution} at {file}, skipping..."
-                )
-                continue
-            self._get_data_from_ncfile(varname, file, data)
+    def data(self, varname) -> Data:
+        return self.data_many([varname])[varname]
 
-        return data
+    def data_many(self, varnames: list[str]) -> dict[str, Data]:
+        """get the filtered data of several variables, opening each file only once
+
+        :param varnames: list of variable names, as in data()
+        :return: dict of variable name -> Data
+        """
+        reader_varnames = {}
+        for varname in varnames:
+            reader_varname = varname
+            for fi in self._get_filters():
+                if isinstance(fi, pyaro.timeseries.Filter.VariableNameFilter):
+                    reader_varname = fi.reader_varname(reader_varname)
+            reader_varnames[varname] = reader_varname
+        datas = self._unfiltered_data_many(list(set(reader_varnames.values())))
+        stats = self._unfiltered_stations()
+        vars = self._unfiltered_variables()
+        result = {}
+        for varname, reader_varname in reader_varnames.items():
+            result[varname] = apply_filters(
+                self.stats, self._get_filters(), datas[reader_varname], stats, vars
+            )
+        return result
 
     def _unfiltered_stations(self) -> dict[str, Station]:
         return self._stations
@@ -253,6 +685,12 @@ class Ascii2NetcdfTimeseriesEngine(AutoFilterReaderEngine.AutoFilterEngine):
     def open(self, filename, *args, **kwargs) -> Ascii2NetcdfTimeseriesReader:
         return self.reader_class()(filename, *args, **kwargs)
 
+    async def open_async(
+        self, filename, *args, **kwargs
+    ) -> Ascii2NetcdfTimeseriesReader:
+        """open without blocking the event loop, see utils.asynchronous"""
+        return await open_async(self.open, filename, *args, **kwargs)
+
     def description(self) -> str:
         return inspect.doc(self)
 
@@ -0,0 +1,314 @@
+"""Memory-mapped snapshots of reader data
+
+A snapshot is a directory with one .npy-file per variable and data-field, the station names
+and a manifest.json with variables, units and stations. It is written once with
+write_snapshot from any pyaro reader, e.g. after parsing a large Aeronet or EBAS
+database, and opened with the npysnapshot engine. The columns are memory-mapped
+(np.load(mmap_mode="r")), so opening is independent of the data size and all processes
+reading the same snapshot share the pages of the operating system's file cache instead
+of holding a copy each.
+"""
+
+import inspect
+import json
+import logging
+import os
+
+import numpy as np
+from pyaro.timeseries import (
+    AutoFilterReaderEngine,
+    Data,
+    Station,
+)
+from pyaro.timeseries.Filter import VariableNameFilter
+
+from ..utils.asynchronous import open_async
+from ..utils.stats import ReaderStats, apply_filters
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+# increase when the layout of the snapshot changes
+SNAPSHOT_VERSION = 1
+
+# data-fields stored per row, stations are stored as station_ids into station_names.npy
+FIELDS = {
+    "values": "f",
+    "station_ids": "u4",
+    "latitudes": "f",
+    "longitudes": "f",
+    "altitudes": "f",
+    "start_times": "datetime64[s]",
+    "end_times": "datetime64[s]",
+    "flags": "i2",
+    "standard_deviations": "f",
+}
+_STATION_FIELDS = [
+    "station",
+    "latitude",
+    "longitude",
+    "altitude",
+    "country",
+    "url",
+    "long_name",
+]
+
+
+class NpySnapshotTimeseriesReaderException(Exception):
+    pass
+
+
+def _column_file(index: int, field: str) -> str:
+    return f"data_{index}.{field}.npy"
+
+
+def write_snapshot(reader, directory: str, variables: [list[str], None] = None):
+    """write the data and stations of a reader as snapshot
+
+    The manifest is written last, so a directory without manifest is an incomplete snapshot.
+
+    :param reader: an open pyaro timeseries reader, its filters are applied
+    :param directory: snapshot directory, created if not existing
+    :param variables: variables to write, defaults to all variables of the reader
+    """
+    if variables is None:
+        variables = reader.variables()
+    os.makedirs(directory, exist_ok=True)
+    manifest = os.path.join(directory, MANIFEST)
+    if os.path.exists(manifest):
+        os.unlink(manifest)
+
+    stations = reader.stations()
+    datas = {var: reader.data(var) for var in variables}
+    names = sorted(
+        set(stations.keys()).union(*[np.unique(da.stations) for da in datas.values()])
+    )
+    station_names = np.array(names, dtype="U64")
+    np.save(os.path.join(directory, "station_names.npy"), station_names)
+
+    manifest_variables = []
+    for i, (variable, da) in enumerate(datas.items()):
+        for field, dtype in FIELDS.items():
+            if field == "station_ids":
+                column = np.searchsorted(station_names, da.stations).astype(dtype)
+            else:
+                column = np.asarray(getattr(da, field), dtype=dtype)
+            np.save(os.path.join(directory, _column_file(i, field)), column)
+        manifest_variables.append(
+            {"variable": variable, "units": da.units, "rows": len(da)}
+        )
+
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "variables": manifest_variables,
+        "stations": [
+            {field: stat[field] for field in _STATION_FIELDS}
+            for stat in stations.values()
+        ],
+    }
+    tmp = manifest + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(meta, fh)
+    os.replace(tmp, manifest)
+
+
+class ColumnData(Data):
+    """Data of independent column-arrays, e.g. memory-mapped .npy-files
+
+    Stations are kept as per-row station_ids into an array of station names, which are only
+    expanded when accessing stations.
+    """
+
+    def __init__(
+        self,
+        variable: str,
+        units: str,
+        columns: dict[str, np.ndarray],
+        station_names: np.ndarray,
+    ):
+        """
+        :param columns: arrays of all FIELDS, of same length
+        :param station_names: station names of the station_ids
+        """
+        self._variable = variable
+        self._units = units
+        self._columns = columns
+        self._station_names = station_names
+
+    def __len__(self) -> int:
+        return len(self._columns["values"])
+
+    def __getitem__(self, key):
+        """access the data as a dict, or a slice"""
+        if isinstance(key, str):
+            if key == "stations":
+                return self.stations
+            return self._columns[key]
+        return self.slice(key)
+
+    def keys(self):
+        """all available data-fields, excluding variable and units"""
+        return list(self._columns.keys()) + ["stations"]
+
+    def slice(self, index):
+        return ColumnData(
+            self._variable,
+            self._units,
+            {key: column[index] for key, column in self._columns.items()},
+            self._station_names,
+        )
+
+    def unique_by_keys(self, keys: [tuple, list]) -> np.array:
+        keys = ["station_ids" if key == "stations" else key for key in keys]
+        rows = np.empty(
+            len(self), dtype=[(key, self._columns[key].dtype) for key in keys]
+        )
+        for key in keys:
+            rows[key] = self._columns[key]
+        return np.unique(rows, return_index=True)[1]
+
+    @property
+    def variable(self) -> str:
+        return self._variable
+
+    @property
+    def units(self) -> str:
+        return self._units
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._columns["values"]
+
+    @property
+    def stations(self) -> np.ndarray:
+        return self._station_names[self._columns["station_ids"]]
+
+    @property
+    def station_ids(self) -> np.ndarray:
+        return self._columns["station_ids"]
+
+    def stations_by_ids(self, station_ids: np.ndarray) -> np.ndarray:
+        return self._station_names[station_ids]
+
+    @property
+    def latitudes(self) -> np.ndarray:
+        return self._columns["latitudes"]
+
+    @property
+    def longitudes(self) -> np.ndarray:
+        return self._columns["longitudes"]
+
+    @property
+    def altitudes(self) -> np.ndarray:
+        return self._columns["altitudes"]
+
+    @property
+    def start_times(self) -> np.ndarray:
+        return self._columns["start_times"]
+
+    @property
+    def end_times(self) -> np.ndarray:
+        return self._columns["end_times"]
+
+    @property
+    def flags(self) -> np.ndarray:
+        return self._columns["flags"]
+
+    @property
+    def standard_deviations(self) -> np.ndarray:
+        return self._columns["standard_deviations"]
+
+
+class NpySnapshotTimeseriesReader(AutoFilterReaderEngine.AutoFilterReader):
+    def __init__(self, filename, filters=[], mmap: bool = True, stats_callback=None):
+        """open a snapshot written by write_snapshot
+
+        :param filename: snapshot directory
+        :param filters: list of filters, defaults to []
+        :param mmap: memory-map the columns, otherwise they are read into memory
+        :param stats_callback: function(kind, name, value) following the timings and counters
+            collected in the stats attribute, see utils.stats
+        """
+        self._set_filters(filters)
+        # timings and counters, only the filtering takes time here
+        self.stats = ReaderStats(stats_callback)
+        self._directory = filename
+        self._mmap_mode = "r" if mmap else None
+        manifest = os.path.join(filename, MANIFEST)
+        if not os.path.exists(manifest):
+            raise NpySnapshotTimeseriesReaderException(
+                f"no snapshot: {MANIFEST} not found in {filename}"
+            )
+        with open(manifest, "r", encoding="utf-8") as fh:
+            meta = json.load(fh)
+        if meta.get("version") != SNAPSHOT_VERSION:
+            raise NpySnapshotTimeseriesReaderException(
+                f"unsupported snapshot version {meta.get('version')} in {filename}"
+            )
+        self._variables = {
+            var["variable"]: (i, var["units"])
+            for i, var in enumerate(meta["variables"])
+        }
+        self._stations = {
+            station["station"]: Station(station) for station in meta["stations"]
+        }
+        self._station_names = self._load("station_names.npy")
+
+    def _load(self, file) -> np.ndarray:
+        return np.load(
+            os.path.join(self._directory, file),
+            mmap_mode=self._mmap_mode,
+            allow_pickle=False,
+        )
+
+    def data(self, varname) -> Data:
+        for fi in self._get_filters():
+            if isinstance(fi, VariableNameFilter):
+                varname = fi.reader_varname(varname)
+        return apply_filters(
+            self.stats,
+            self._get_filters(),
+            self._unfiltered_data(varname),
+            self._unfiltered_stations(),
+            self._unfiltered_variables(),
+        )
+
+    def _unfiltered_data(self, varname) -> Data:
+        if varname not in self._variables:
+            raise NpySnapshotTimeseriesReaderException(
+                f"unknown variable {varname} in {self._directory}"
+            )
+        i, units = self._variables[varname]
+        columns = {field: self._load(_column_file(i, field)) for field in FIELDS}
+        return ColumnData(varname, units, columns, self._station_names)
+
+    def _unfiltered_stations(self) -> dict[str, Station]:
+        return self._stations
+
+    def _unfiltered_variables(self) -> list[str]:
+        return list(self._variables.keys())
+
+    def close(self):
+        pass
+
+
+class NpySnapshotTimeseriesEngine(AutoFilterReaderEngine.AutoFilterEngine):
+    """Memory-mapped snapshots of reader data, written with write_snapshot"""
+
+    def reader_class(self):
+        return NpySnapshotTimeseriesReader
+
+    def open(self, filename, *args, **kwargs) -> NpySnapshotTimeseriesReader:
+        return self.reader_class()(filename, *args, **kwargs)
+
+    async def open_async(
+        self, filename, *args, **kwargs
+    ) -> NpySnapshotTimeseriesReader:
+        """open without blocking the event loop, see utils.asynchronous"""
+        return await open_async(self.open, filename, *args, **kwargs)
+
+    def description(self) -> str:
+        return inspect.doc(self)
+
+    def url(self):
+        return "https://github.com/metno/pyaro-readers"
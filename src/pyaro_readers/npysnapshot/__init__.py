@@ -0,0 +1,5 @@
+from .NpySnapshotTimeseries import (
+    NpySnapshotTimeseriesEngine,
+    NpySnapshotTimeseriesReader,
+    write_snapshot,
+)
@@ -0,0 +1,1411 @@
+"""Helpers shared by the Aeronet Sun and SDA readers
+
+The Aeronet csv-files of both products have the same layout: some header lines, a line with
+the column names and data-lines with one row per site and time. The helpers read the needed
+columns of the data-lines into numpy arrays, AeronetTimeseriesReader builds the pyaro data of
+both readers from them.
+"""
+
+import copy
+import csv
+import io
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from fnmatch import fnmatch
+from itertools import islice
+
+import numpy as np
+from pyaro.timeseries import (
+    AutoFilterReaderEngine,
+    Data,
+    Flag,
+    Station,
+)
+from pyaro.timeseries.Filter import (
+    BoundingBoxFilter,
+    StationFilter,
+    TimeBoundsFilter,
+    VariableNameFilter,
+)
+from tqdm import tqdm
+
+try:
+    import pyarrow
+    import pyarrow.csv
+except ImportError:
+    pyarrow = None
+
+from .aggregation import METHODS, PERIODS, aggregate
+from .cache import CACHE_MAX_BYTES, DataCache
+from .data import (
+    compact_data,
+    compact_structured,
+    row_template,
+    station_ids,
+    station_table_from_stations,
+    structured_data,
+)
+from .download import (
+    detect_format,
+    first_zip_member,
+    is_valid_url,
+    iter_tar_members,
+    open_stream,
+)
+from .geocoding import NO_COUNTRY, lookup_countries
+from .stats import (
+    AGGREGATE,
+    ASSEMBLE,
+    CACHE_LOAD,
+    DECOMPRESS,
+    DERIVED_VARIABLES,
+    DROPPED_ROWS,
+    FILTERED_ROWS,
+    GEOCODING,
+    HEADER_PARSE,
+    LAZY_ROWS,
+    ROW_PARSE,
+    ROWS,
+    ReaderStats,
+    apply_filters,
+)
+
+DELIMITER = ","
+NAN_VAL = -999.0
+# number of data-lines parsed at once
+CHUNK_ROWS = 100000
+# columns replacing the site, date and time strings, see ColumnEncoder
+SITE_CODES = "site_codes"
+TIMES = "times"
+# half the period of a row, the times of the files are the middle of the period
+TS_TYPE_DIFFS = {
+    "daily": np.timedelta64(12, "h"),
+    "instantaneous": np.timedelta64(0, "s"),
+    "points": np.timedelta64(0, "s"),
+    "monthly": np.timedelta64(15, "D"),
+}
+
+
+def read_file(
+    filename,
+    header_line_no: int,
+    string_columns: list[str],
+    float_columns: list[str],
+    backend: str = "numpy",
+    tqdm_desc: [str, None] = None,
+    file_mask: [str, None] = None,
+    max_workers: int = 1,
+    spool=None,
+    line_filter: ["LineFilter", None] = None,
+    stats: [ReaderStats, None] = None,
+    chunk_rows: int = CHUNK_ROWS,
+    encoder: ["ColumnEncoder", None] = None,
+) -> tuple[list[str], list[str], dict[str, np.ndarray]]:
+    """read the required columns of an Aeronet file, URL or archive
+
+    The data is streamed, i.e. neither the archive nor the lines are held in memory.
+    Zip-archives contain all data in a single file, only the first member is read.
+    Tar-archives contain one file per station: the header of the first member matching
+    file_mask is kept and the data-lines of all members are appended, giving the same
+    layout as the zip-file.
+
+    :param filename: URL or path of a csv-, zip- or (compressed) tar-file
+    :param header_line_no: number of header lines, including the line with the column names
+    :param string_columns: columns to read as strings
+    :param float_columns: columns to read as floats
+    :param backend: "numpy", "csv" or "arrow", see read_columns; arrow parses csv- and
+        zip-files without line_filter and spool from the byte stream, see read_stream_arrow
+    :param tqdm_desc: description of the progress bar
+    :param file_mask: glob of the station files in tar-archives, tar-files are not supported
+        if not given
+    :param max_workers: number of processes parsing the members of tar-archives in parallel
+    :param spool: writable text-file receiving the header and all data-lines, i.e. an
+        uncompressed copy of the source which can be read again without download or extraction
+    :param line_filter: skip data-lines outside of the filters before parsing, the spool
+        receives only the selected lines
+    :param stats: ReaderStats receiving timings, rows, skipped rows and bytes read
+    :param chunk_rows: number of lines parsed at once
+    :param encoder: ColumnEncoder reducing the string columns of each parsed block
+    :return: tuple of header lines, column names and dict of column-name -> numpy array
+    """
+    if stats is None:
+        stats = ReaderStats()
+    with open_stream(filename, stats=stats) as stream:
+        file_format = detect_format(stream)
+        if (
+            backend == "arrow"
+            and file_format != "tar"
+            and not line_filter
+            and not spool
+        ):
+            # pyarrow splits and converts the bytes itself, no lines needed
+            if file_format == "zip":
+                stream = first_zip_member(stream)
+            with stats.phase(HEADER_PARSE):
+                header = [
+                    stream.readline().decode("utf-8")
+                    for _hidx in range(header_line_no - 1)
+                ]
+                fields = stream.readline().decode("utf-8").strip().split(",")
+            columns = read_stream_arrow(
+                stream,
+                fields,
+                string_columns,
+                float_columns,
+                tqdm_desc,
+                chunk_rows,
+                stats,
+                encoder,
+            )
+            return header, fields, columns
+        if file_format == "zip":
+            lines = io.TextIOWrapper(first_zip_member(stream), encoding="utf-8")
+        elif file_format == "tar":
+            if file_mask is None:
+                raise Exception(f"tar-files not supported: {filename}")
+            if max_workers > 1:
+                return _read_tar_parallel(
+                    stream,
+                    header_line_no,
+                    string_columns,
+                    float_columns,
+                    backend,
+                    tqdm_desc,
+                    file_mask,
+                    max_workers,
+                    spool,
+                    line_filter,
+                    stats,
+                    encoder,
+                )
+            lines = _tar_lines(stream, header_line_no, file_mask)
+        else:
+            lines = io.TextIOWrapper(stream, encoding="utf-8")
+
+        with stats.phase(HEADER_PARSE):
+            header = [next(lines) for _hidx in range(header_line_no - 1)]
+            # get fields from header line although csv can do that as well since we might want to adjust these names
+            fields = next(lines).strip().split(",")
+        keep = None
+        if line_filter:
+            keep = line_filter.bind(fields)
+            lines = filter(keep, lines)
+        if spool is not None:
+            spool.writelines(header)
+            spool.write(",".join(fields) + "\n")
+            lines = _spooled(lines, spool)
+        columns = read_columns(
+            lines,
+            fields,
+            string_columns,
+            float_columns,
+            backend,
+            tqdm_desc,
+            chunk_rows,
+            stats,
+            encoder,
+        )
+    if keep is not None:
+        stats.count(DROPPED_ROWS, keep.dropped)
+    if spool is not None:
+        spool.flush()
+    return header, fields, columns
+
+
+def _spooled(lines, spool):
+    for line in lines:
+        _spool_lines([line], spool)
+        yield line
+
+
+def _spool_lines(lines, spool):
+    # the last line of a station file in a tar-archive may lack the newline
+    for line in lines:
+        spool.write(line if line.endswith("\n") else line + "\n")
+
+
+def needs_spool(filename) -> bool:
+    """True if reading filename again requires a download or extraction, see read_file"""
+    if is_valid_url(filename):
+        return True
+    with open_stream(filename) as stream:
+        return detect_format(stream) != "text"
+
+
+def _tar_lines(stream, header_line_no: int, file_mask: str):
+    first = True
+    bar = tqdm(desc="extracting tar file...")
+    for name, member in iter_tar_members(stream):
+        if not fnmatch(name, file_mask):
+            continue
+        bar.update(1)
+        # members of tar-streams are not seekable, which io.TextIOWrapper requires
+        lines = (line.decode("utf-8") for line in member)
+        if not first:
+            # skip the header lines
+            for _hidx in range(header_line_no):
+                next(lines, None)
+        first = False
+        yield from lines
+    bar.close()
+
+
+def _read_member(
+    content: bytes,
+    header_line_no: int,
+    fields: list[str],
+    string_columns: list[str],
+    float_columns: list[str],
+    backend: str,
+    line_filter: ["LineFilter", None] = None,
+    keep_lines: bool = False,
+) -> tuple[[list[str], int], dict[str, np.ndarray], dict]:
+    """worker parsing the content of a tar-member, i.e. the file of one station
+
+    :param keep_lines: return the selected data-lines, e.g. for spooling them, instead of
+        only their number, to not send the text back to the parent process otherwise
+    :return: tuple of the selected data-lines or their number, their columns and the
+        ReaderStats.as_dict()
+    """
+    stats = ReaderStats()
+    with stats.phase(DECOMPRESS):
+        lines = [line.decode("utf-8") for line in io.BytesIO(content)][header_line_no:]
+        if line_filter:
+            selected = list(filter(line_filter.bind(fields), lines))
+            stats.count(DROPPED_ROWS, len(lines) - len(selected))
+            lines = selected
+    with stats.phase(ROW_PARSE):
+        block = _BLOCK_READERS[backend](lines, fields, string_columns, float_columns)
+    stats.count(ROWS, len(lines))
+    return (lines if keep_lines else len(lines)), block, stats.as_dict()
+
+
+def _read_tar_parallel(
+    stream,
+    header_line_no: int,
+    string_columns: list[str],
+    float_columns: list[str],
+    backend: str,
+    tqdm_desc: [str, None],
+    file_mask: str,
+    max_workers: int,
+    spool=None,
+    line_filter: ["LineFilter", None] = None,
+    stats: [ReaderStats, None] = None,
+    encoder: ["ColumnEncoder", None] = None,
+) -> tuple[list[str], list[str], dict[str, np.ndarray]]:
+    """parse the members of a tar-stream in a pool of processes, see read_file
+
+    The members are read sequentially from the stream and handed to the workers, the number
+    of members in flight is limited to keep the memory bounded. The results are merged in
+    archive order, giving the same columns as the serial reading. The encoder is applied
+    when merging, so the codes are the same as for the serial reading.
+    """
+    if stats is None:
+        stats = ReaderStats()
+    header = []
+    fields = None
+    blocks = []
+    pending = deque()
+    bar = tqdm(desc=tqdm_desc)
+
+    def collect():
+        lines, block, member_stats = pending.popleft().result()
+        with stats.phase(ROW_PARSE):
+            block = encoder(block) if encoder is not None else _expanded(block)
+        blocks.append(block)
+        stats.merge(member_stats)
+        if spool is not None:
+            _spool_lines(lines, spool)
+            lines = len(lines)
+        bar.update(lines)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for name, member in iter_tar_members(stream):
+            if not fnmatch(name, file_mask):
+                continue
+            with stats.phase(DECOMPRESS):
+                content = member.read()
+            if fields is None:
+                lines = [line.decode("utf-8") for line in io.BytesIO(content)]
+                header = lines[: header_line_no - 1]
+                fields = lines[header_line_no - 1].strip().split(",")
+                if spool is not None:
+                    spool.writelines(header)
+                    spool.write(",".join(fields) + "\n")
+            pending.append(
+                executor.submit(
+                    _read_member,
+                    content,
+                    header_line_no,
+                    fields,
+                    string_columns,
+                    float_columns,
+                    backend,
+                    line_filter,
+                    spool is not None,
+                )
+            )
+            while len(pending) > 2 * max_workers:
+                collect()
+        while pending:
+            collect()
+    bar.close()
+    if fields is None:
+        raise Exception(f"no files matching {file_mask} in tar-file")
+    if spool is not None:
+        spool.flush()
+    if not blocks:
+        blocks.append(_empty_block(string_columns, float_columns, encoder))
+    return header, fields, _concatenate(blocks)
+
+
+def field_index(fields: list[str], name: str) -> int:
+    """position of a column in the data-lines
+
+    csv.DictReader uses the last column if a fieldname is duplicated, so do we.
+    """
+    return len(fields) - 1 - fields[::-1].index(name)
+
+
+def read_columns(
+    lines,
+    fields: list[str],
+    string_columns: list[str],
+    float_columns: list[str],
+    backend: str = "numpy",
+    tqdm_desc: [str, None] = None,
+    chunk_rows: int = CHUNK_ROWS,
+    stats: [ReaderStats, None] = None,
+    encoder: ["ColumnEncoder", None] = None,
+) -> dict[str, np.ndarray]:
+    """read the required columns of the data-lines in blocks of chunk_rows lines
+
+    Only the lines of one block are held in memory at a time. With an encoder, the string
+    columns of each block are reduced before the next block is read, so the memory of the
+    result is mainly the float columns and the peak memory is about the size of one block
+    above that.
+
+    :param lines: iterable of data-lines, header already removed
+    :param fields: column names of the data-lines
+    :param string_columns: columns to read as strings
+    :param float_columns: columns to read as floats
+    :param backend: "numpy", "csv" or "arrow", see read_columns_numpy, read_columns_csv and
+        read_columns_arrow
+    :param tqdm_desc: description of the progress bar
+    :param chunk_rows: number of lines parsed at once
+    :param stats: ReaderStats receiving the time to get (DECOMPRESS) and parse (ROW_PARSE)
+        the lines, and the number of ROWS
+    :param encoder: ColumnEncoder applied to each block
+    :return: dict of column-name -> numpy array
+    """
+    if stats is None:
+        stats = ReaderStats()
+    read_block = _BLOCK_READERS[backend]
+    lines = iter(lines)
+    blocks = []
+    bar = tqdm(desc=tqdm_desc)
+    while True:
+        with stats.phase(DECOMPRESS):
+            block = list(islice(lines, chunk_rows))
+        if not block:
+            break
+        with stats.phase(ROW_PARSE):
+            columns = read_block(block, fields, string_columns, float_columns)
+            columns = encoder(columns) if encoder is not None else _expanded(columns)
+            blocks.append(columns)
+        stats.count(ROWS, len(block))
+        bar.update(len(block))
+    bar.close()
+    if not blocks:
+        blocks.append(_empty_block(string_columns, float_columns, encoder))
+    with stats.phase(ROW_PARSE):
+        return _concatenate(blocks)
+
+
+def _empty_block(
+    string_columns: list[str],
+    float_columns: list[str],
+    encoder: ["ColumnEncoder", None] = None,
+) -> dict[str, np.ndarray]:
+    """columns without lines"""
+    block = {name: np.empty(0, dtype="U64") for name in string_columns}
+    block.update({name: np.empty(0, dtype="f8") for name in float_columns})
+    if encoder is not None:
+        block = encoder(block)
+    return block
+
+
+class FactorizedColumn:
+    """string column as its distinct values and the per-row codes into them
+
+    The arrow backend parses the string columns dictionary-encoded, ColumnEncoder and
+    parse_times use the distinct values directly instead of strings of every row.
+    """
+
+    def __init__(self, values: np.ndarray, codes: np.ndarray):
+        self.values = values
+        self.codes = codes
+
+    def __len__(self):
+        return len(self.codes)
+
+    def expanded(self) -> np.ndarray:
+        """the string of each row"""
+        return self.values.astype("U64")[self.codes]
+
+
+def _factorized(column) -> tuple[np.ndarray, np.ndarray]:
+    """distinct values and per-row codes of a string or FactorizedColumn column"""
+    if isinstance(column, FactorizedColumn):
+        return column.values, column.codes
+    values, codes = np.unique(column, return_inverse=True)
+    return values, codes.reshape(-1)
+
+
+def _expanded(block: dict) -> dict[str, np.ndarray]:
+    """block with the FactorizedColumns replaced by strings, for reading without encoder"""
+    return {
+        name: column.expanded() if isinstance(column, FactorizedColumn) else column
+        for name, column in block.items()
+    }
+
+
+def _concatenate(blocks: list[dict[str, np.ndarray]]) -> dict[str, np.ndarray]:
+    """join the columns of several blocks of lines"""
+    if len(blocks) == 1:
+        return blocks[0]
+    return {
+        name: np.concatenate([block[name] for block in blocks]) for name in blocks[0]
+    }
+
+
+def read_columns_numpy(
+    lines, fields: list[str], string_columns: list[str], float_columns: list[str]
+) -> dict[str, np.ndarray]:
+    """read only the required columns of the data-lines in one go
+
+    :param lines: data-lines, header already removed
+    :param fields: column names of the data-lines
+    :param string_columns: columns to read as strings
+    :param float_columns: columns to read as floats
+    :return: dict of column-name -> numpy array
+    """
+    dtype = [(name, "U64") for name in string_columns]
+    dtype += [(name, "f8") for name in float_columns]
+    usecols = [field_index(fields, name) for name, _ in dtype]
+    table = np.loadtxt(
+        lines,
+        delimiter=DELIMITER,
+        usecols=usecols,
+        dtype=dtype,
+        comments=None,
+        ndmin=1,
+    )
+    # copies, views would keep the whole table including unused strings alive
+    return {name: table[name].copy() for name, _ in dtype}
+
+
+def read_columns_csv(
+    lines, fields: list[str], string_columns: list[str], float_columns: list[str]
+) -> dict[str, np.ndarray]:
+    """read the required columns of the data-lines row by row with Python's csv module
+
+    :param lines: data-lines, header already removed
+    :param fields: column names of the data-lines
+    :param string_columns: columns to read as strings
+    :param float_columns: columns to read as floats
+    :return: dict of column-name -> numpy array
+    """
+    columns = {name: [] for name in string_columns + float_columns}
+    crd = csv.DictReader(lines, fieldnames=fields, delimiter=DELIMITER)
+    for row in crd:
+        for name in string_columns:
+            columns[name].append(row[name])
+        for name in float_columns:
+            columns[name].append(float(row[name]))
+    return {
+        name: np.array(col, dtype="U64" if name in string_columns else "f8")
+        for name, col in columns.items()
+    }
+
+
+def _arrow_options(
+    fields: list[str],
+    string_columns: list[str],
+    float_columns: list[str],
+    block_size: [int, None] = None,
+):
+    """pyarrow csv-options reading the required columns of data-lines
+
+    Columns are selected by position, since fields may be duplicated. String columns are
+    dictionary-encoded, i.e. each distinct site, date and time is converted once.
+
+    :return: tuple of dict of column-name -> arrow column-name, and the read-, parse- and
+        convert-options
+    """
+    positions = {
+        name: f"f{field_index(fields, name)}" for name in string_columns + float_columns
+    }
+    column_types = {
+        positions[name]: pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+        for name in string_columns
+    }
+    column_types.update({positions[name]: pyarrow.float64() for name in float_columns})
+    read_options = pyarrow.csv.ReadOptions(
+        autogenerate_column_names=True, use_threads=True
+    )
+    if block_size is not None:
+        read_options.block_size = block_size
+    return (
+        positions,
+        read_options,
+        pyarrow.csv.ParseOptions(delimiter=DELIMITER),
+        pyarrow.csv.ConvertOptions(
+            include_columns=list(column_types), column_types=column_types
+        ),
+    )
+
+
+def _arrow_columns(
+    table,
+    positions: dict[str, str],
+    string_columns: list[str],
+    float_columns: list[str],
+) -> dict:
+    """numpy columns of an arrow table or record batch, strings as FactorizedColumn"""
+    columns = {}
+    for name in string_columns:
+        column = table.column(positions[name])
+        if isinstance(column, pyarrow.ChunkedArray):
+            column = column.unify_dictionaries().combine_chunks()
+        columns[name] = FactorizedColumn(
+            column.dictionary.to_numpy(zero_copy_only=False),
+            column.indices.to_numpy(zero_copy_only=False),
+        )
+    for name in float_columns:
+        column = table.column(positions[name])
+        if isinstance(column, pyarrow.ChunkedArray):
+            column = column.combine_chunks()
+        # without nulls, the values are not copied
+        columns[name] = column.to_numpy(zero_copy_only=False)
+    return columns
+
+
+def read_columns_arrow(
+    lines, fields: list[str], string_columns: list[str], float_columns: list[str]
+) -> dict:
+    """read only the required columns of the data-lines with pyarrow's multi-threaded csv-parser
+
+    Used for lines which are selected or spooled before parsing, and for the members of
+    tar-archives; other files are parsed from the byte stream, see read_stream_arrow.
+
+    :param lines: data-lines, header already removed
+    :param fields: column names of the data-lines
+    :param string_columns: columns to read as FactorizedColumn
+    :param float_columns: columns to read as floats
+    :return: dict of column-name -> numpy array or FactorizedColumn
+    """
+    if not lines:
+        return _empty_block(string_columns, float_columns)
+    positions, *options = _arrow_options(fields, string_columns, float_columns)
+    content = "".join(lines)
+    if content.count("\n") != len(lines):
+        # e.g. the last line of a tar-member
+        content = "".join(line.rstrip("\n") + "\n" for line in lines)
+    table = pyarrow.csv.read_csv(
+        pyarrow.BufferReader(content.encode("utf-8")), *options
+    )
+    return _arrow_columns(table, positions, string_columns, float_columns)
+
+
+def read_stream_arrow(
+    stream,
+    fields: list[str],
+    string_columns: list[str],
+    float_columns: list[str],
+    tqdm_desc: [str, None] = None,
+    chunk_rows: int = CHUNK_ROWS,
+    stats: [ReaderStats, None] = None,
+    encoder: ["ColumnEncoder", None] = None,
+) -> dict[str, np.ndarray]:
+    """read the required columns from a binary stream of data-lines with pyarrow
+
+    The decompressed bytes are handed to pyarrow's streaming csv-reader, which splits, decodes
+    and converts them in its own threads. The blocks of about chunk_rows lines are reduced by
+    the encoder as in read_columns.
+
+    :param stream: binary stream positioned after the header
+    :param fields: column names of the data-lines
+    :param string_columns: columns to read as strings
+    :param float_columns: columns to read as floats
+    :param tqdm_desc: description of the progress bar
+    :param chunk_rows: approximate number of lines parsed at once
+    :param stats: ReaderStats receiving the time to parse (ROW_PARSE) the lines, including
+        reading the stream, and the number of ROWS
+    :param encoder: ColumnEncoder applied to each block
+    :return: dict of column-name -> numpy array
+    """
+    if stats is None:
+        stats = ReaderStats()
+    first_line = stream.peek().split(b"\n", 1)[0]
+    if not first_line:
+        return _empty_block(string_columns, float_columns, encoder)
+    positions, *options = _arrow_options(
+        fields, string_columns, float_columns, chunk_rows * (len(first_line) + 1)
+    )
+    blocks = []
+    bar = tqdm(desc=tqdm_desc)
+    with stats.phase(ROW_PARSE):
+        reader = pyarrow.csv.open_csv(stream, *options)
+    while True:
+        with stats.phase(ROW_PARSE):
+            try:
+                batch = reader.read_next_batch()
+            except StopIteration:
+                break
+            columns = _arrow_columns(batch, positions, string_columns, float_columns)
+            columns = encoder(columns) if encoder is not None else _expanded(columns)
+            blocks.append(columns)
+        stats.count(ROWS, batch.num_rows)
+        bar.update(batch.num_rows)
+    bar.close()
+    if not blocks:
+        blocks.append(_empty_block(string_columns, float_columns, encoder))
+    with stats.phase(ROW_PARSE):
+        return _concatenate(blocks)
+
+
+_BLOCK_READERS = {
+    "numpy": read_columns_numpy,
+    "csv": read_columns_csv,
+    "arrow": read_columns_arrow,
+}
+# parsers of the data-lines, "auto" uses arrow if pyarrow is installed, numpy otherwise
+BACKENDS = ["auto", *_BLOCK_READERS]
+
+
+def resolve_backend(backend: str) -> str:
+    """the parser to use for backend, see BACKENDS"""
+    if backend not in BACKENDS:
+        raise Exception(f"unknown backend '{backend}', use one of {BACKENDS}")
+    if backend == "auto":
+        return "numpy" if pyarrow is None else "arrow"
+    if backend == "arrow" and pyarrow is None:
+        raise Exception("backend 'arrow' needs pyarrow, install pyaro-readers[arrow]")
+    return backend
+
+
+def parse_times(dates: np.ndarray, times: np.ndarray) -> np.ndarray:
+    """convert the date (dd:mm:yyyy) and time (hh:mm:ss) columns to datetime64[s]
+
+    Only the unique dates and times are parsed, the result is mapped back to all rows.
+
+    :param dates: string column or FactorizedColumn
+    :param times: string column or FactorizedColumn
+    """
+    udates, date_idx = _factorized(dates)
+    days = np.array(
+        ["-".join(date.split(":")[::-1]) for date in udates], dtype="datetime64[D]"
+    )
+    utimes, time_idx = _factorized(times)
+    seconds = np.array(
+        [
+            3600 * int(hh) + 60 * int(mm) + int(ss)
+            for hh, mm, ss in (time.split(":") for time in utimes)
+        ],
+        dtype="timedelta64[s]",
+    )
+    return days[date_idx].astype("datetime64[s]") + seconds[time_idx]
+
+
+class ColumnEncoder:
+    """reduce the string columns of blocks of parsed lines to compact arrays
+
+    The site names (U64, 256 bytes per row) are replaced by SITE_CODES, integer indices into
+    site_names(), and the date and time strings by datetime64[s] TIMES. The codes are kept
+    consistent over all blocks passed to the same encoder.
+    """
+
+    def __init__(self, site_column: str, date_column: str, time_column: str):
+        self._site_column = site_column
+        self._date_column = date_column
+        self._time_column = time_column
+        self._codes = {}
+
+    def __call__(self, block: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        if self._site_column in block:
+            names, inverse = _factorized(block.pop(self._site_column))
+            codes = np.array(
+                [self._codes.setdefault(str(name), len(self._codes)) for name in names],
+                dtype="u4",
+            )
+            block[SITE_CODES] = codes[inverse]
+        if self._date_column in block and self._time_column in block:
+            block[TIMES] = parse_times(
+                block.pop(self._date_column), block.pop(self._time_column)
+            )
+        return block
+
+    def site_names(self) -> np.ndarray:
+        """names of the sites, indexed by the SITE_CODES"""
+        return np.array(list(self._codes), dtype="U64")
+
+
+def station_blocks(sites: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """find the blocks of consecutive rows belonging to the same site
+
+    :param sites: site-name or SITE_CODES column
+    :return: tuple of the first row of each block, and for each row the first row of its block
+    """
+    row_no = len(sites)
+    new_site = np.ones(row_no, dtype=bool)
+    new_site[1:] = sites[1:] != sites[:-1]
+    block_starts = np.flatnonzero(new_site)
+    block_idx = np.repeat(block_starts, np.diff(np.append(block_starts, row_no)))
+    return block_starts, block_idx
+
+
+class LineFilter:
+    """Selection of data-lines before parsing, derived from the filters of a reader.
+
+    Station-, bounding-box- and the envelope of time-bounds-filters are evaluated on the raw
+    text of a line, i.e. only the few needed fields are split off and the decisions are
+    memoized per site and per date. The selection is conservative: the exact filtering is
+    still done by the reader, lines are only skipped if no row of them can pass the filters.
+    """
+
+    def __init__(
+        self,
+        filters,
+        site_column: str,
+        date_column: str,
+        lat_column: str,
+        lon_column: str,
+        time_margin: np.timedelta64 = np.timedelta64(0, "s"),
+        after: [dict[str, np.datetime64], None] = None,
+    ):
+        """
+        :param filters: filters of the reader, unsupported filters are ignored
+        :param site_column: column with the site-names
+        :param date_column: column with the dates as dd:mm:yyyy
+        :param lat_column: column with the latitudes
+        :param lon_column: column with the longitudes
+        :param time_margin: maximum difference of start- or end-time to the time of a line
+        :param after: skip the lines of sites up to their time in this dict, e.g. the data
+            already read; only whole days are skipped, see newer_rows for the exact selection
+        """
+        self._after = after or {}
+        self._site_column = site_column
+        self._date_column = date_column
+        self._lat_column = lat_column
+        self._lon_column = lon_column
+        self._station_filters = []
+        self._bbox_filters = []
+        self._envelope = None
+        for fil in filters:
+            if isinstance(fil, StationFilter):
+                self._station_filters.append(fil)
+            elif isinstance(fil, BoundingBoxFilter):
+                self._bbox_filters.append(fil)
+            elif isinstance(fil, TimeBoundsFilter) and fil.has_envelope():
+                start, end = fil.envelope()
+                start = np.datetime64(start, "s") - time_margin
+                end = np.datetime64(end, "s") + time_margin
+                if self._envelope is not None:
+                    # all filters are applied, i.e. the envelopes intersect
+                    start = max(start, self._envelope[0])
+                    end = min(end, self._envelope[1])
+                self._envelope = (start, end)
+
+    def __bool__(self):
+        return bool(
+            self._station_filters
+            or self._bbox_filters
+            or self._envelope is not None
+            or self._after
+        )
+
+    def updating(self, after: dict[str, np.datetime64]) -> "LineFilter":
+        """copy of this filter skipping additionally the lines up to the times in after"""
+        line_filter = copy.copy(self)
+        line_filter._after = after
+        return line_filter
+
+    def key(self) -> list:
+        """description of the selection by the filters, e.g. for cache-keys"""
+        return [
+            [fil.name(), fil.init_kwargs()]
+            for fil in self._station_filters + self._bbox_filters
+        ] + [[str(t) for t in self._envelope] if self._envelope else None]
+
+    def bind(self, fields: list[str]):
+        """predicate selecting the raw data-lines of a file with the given column names
+
+        :param fields: column names of the data-lines
+        :return: function line -> bool, with the number of rejected lines in its attribute
+            dropped
+        """
+        get_site = _field_getter(fields, self._site_column)
+        get_date = _field_getter(fields, self._date_column)
+        get_lat = _field_getter(fields, self._lat_column)
+        get_lon = _field_getter(fields, self._lon_column)
+        sites = {}
+        days = {}
+
+        def day_of(date):
+            if date not in days:
+                days[date] = np.datetime64("-".join(date.split(":")[::-1]), "s")
+            return days[date]
+
+        def keep_site(line):
+            site = get_site(line)
+            if site not in sites:
+                keep = all(fil.has_station(site) for fil in self._station_filters)
+                if keep and self._bbox_filters:
+                    # the station gets the coordinates of its first line
+                    lat = float(get_lat(line))
+                    lon = float(get_lon(line))
+                    keep = all(fil.has_location(lat, lon) for fil in self._bbox_filters)
+                sites[site] = keep
+            return sites[site]
+
+        def keep_date(line):
+            day = day_of(get_date(line))
+            start, end = self._envelope
+            return start < day + np.timedelta64(1, "D") and day <= end
+
+        def keep_new(line):
+            last = self._after.get(get_site(line))
+            if last is None:
+                return True
+            return day_of(get_date(line)) + np.timedelta64(1, "D") > last
+
+        def keep(line):
+            try:
+                if self._envelope is not None and not keep_date(line):
+                    keep.dropped += 1
+                    return False
+                if not keep_site(line):
+                    keep.dropped += 1
+                    return False
+                if self._after and not keep_new(line):
+                    keep.dropped += 1
+                    return False
+                return True
+            except (IndexError, ValueError):
+                # leave broken lines to the parser
+                return True
+
+        # number of lines rejected so far
+        keep.dropped = 0
+        return keep
+
+
+def last_times(stations: np.ndarray, times: np.ndarray) -> dict[str, np.datetime64]:
+    """latest time of each station"""
+    if len(stations) == 0:
+        return {}
+    order = np.lexsort((times, stations))
+    stations, times = stations[order], times[order]
+    last = np.append(stations[1:] != stations[:-1], True)
+    return dict(zip(stations[last].tolist(), times[last]))
+
+
+def newer_rows(
+    stations: np.ndarray, times: np.ndarray, after: dict[str, np.datetime64]
+) -> np.ndarray:
+    """boolean mask of the rows later than the time of their station in after
+
+    rows of stations not in after are always selected
+    """
+    names, inverse = np.unique(stations, return_inverse=True)
+    limits = np.array(
+        [after.get(str(name), np.datetime64("NaT")) for name in names],
+        dtype="datetime64[s]",
+    )[inverse]
+    return np.isnat(limits) | (times > limits)
+
+
+def _field_getter(fields: list[str], name: str):
+    """function extracting the text of a single field from a raw line without splitting all
+
+    Fields are counted from the start of the line like in the parsers: the column names may
+    have a trailing delimiter the data-lines don't have, e.g. in SDA files.
+    """
+    idx = field_index(fields, name)
+    return lambda line: line.split(DELIMITER, idx + 1)[idx].strip()
+
+
+class AeronetTimeseriesReader(AutoFilterReaderEngine.AutoFilterReader):
+    """base of the Aeronet Sun and SDA readers
+
+    The readers differ only by the columns and variables of their files, which they set as
+    class attributes; the ingest, caching and data-access is shared.
+    """
+
+    # number of header lines, including the line with the column names
+    HEADER_LINE_NO = 7
+    SITE_NAME = "AERONET_Site_Name"
+    DATE_NAME = "Date(dd:mm:yyyy)"
+    TIME_NAME = "Time(hh:mm:ss)"
+    LAT_NAME = "Site_Latitude(Degrees)"
+    LON_NAME = "Site_Longitude(Degrees)"
+    ALT_NAME = "Site_Elevation(m)"
+    # variables of the reader, including the COMPUTED_VARS
+    DATA_VARS = []
+    # variables computed from the read ones after ingest:
+    # name -> (wavelength [um], reference AOD, reference wavelength [um], Angstrom exponent)
+    COMPUTED_VARS = {}
+    # station files of tar-archives, see read_file
+    FILE_MASK = None
+
+    def __init__(
+        self,
+        filename,
+        filters=[],
+        fill_country_flag: bool = False,
+        tqdm_desc: [str, None] = None,
+        ts_type: str = "daily",
+        backend: str = "numpy",
+        chunk_rows: int = CHUNK_ROWS,
+        cache_dir: [str, None] = None,
+        cache_max_bytes: int = CACHE_MAX_BYTES,
+        max_workers: int = 1,
+        lazy: bool = False,
+        compact: bool = False,
+        incremental: bool = False,
+        aggregate: [str, None] = None,
+        aggregate_method: str = "mean",
+        stats_callback=None,
+    ):
+        """open a new Aeronet timeseries-reader
+
+        :param filename: str
+        :param filters:
+        :param fill_country_flag:
+        :param tqdm_desc:
+        :param ts_type:
+        :param backend: parser for the data-lines, see BACKENDS; "numpy" reads only the
+            needed columns into arrays in one pass, "csv" uses Python's csv module row by row,
+            "arrow" pyarrow's multi-threaded csv-parser; "auto" uses arrow if pyarrow is
+            installed and numpy otherwise
+        :param chunk_rows: number of data-lines parsed at once; the site, date and time strings
+            of each block are reduced to integer codes and times before the next block is read,
+            so the peak memory stays near the block size above the result
+        :param cache_dir: directory to cache the parsed data in, the cache is used as long as
+            the source is unchanged; no caching if None
+        :param cache_max_bytes: size of the cache directory, least recently used entries are removed
+        :param max_workers: number of processes parsing the station files of tar-archives
+            in parallel, 1 parses them sequentially
+        :param lazy: only read stations and times when opening, each variable is parsed on first
+            access by parsing the source again, once per variable; URLs and archives are kept
+            as uncompressed temporary file until close
+        :param compact: return DataStationIdStructured with per-row station-ids and the station
+            names and coordinates stored once, instead of NpStructuredData
+        :param incremental: update the cached data of an earlier version of the source by parsing
+            only the rows after the last time of each site and appending them; needs cache_dir
+        :param aggregate: aggregate the rows of each station to the periods "daily", "monthly" or
+            "yearly" while reading, see utils.aggregation; None keeps the rows of the file
+        :param aggregate_method: "mean", "median" or "count" of the finite values of a period
+        :param stats_callback: function(kind, name, value) following the timings and counters
+            collected in the stats attribute, see utils.stats
+        """
+        self._filename = filename
+        self._stations = {}
+        self._data = {}  # var -> {data-array}
+        self._set_filters(filters)
+        self._header = []
+        self._tqdm_desc = tqdm_desc
+        self._backend = resolve_backend(backend)
+        self._chunk_rows = chunk_rows
+        # (period, method) of the temporal aggregation
+        self._aggregate = None
+        if aggregate is not None:
+            self._aggregate = (aggregate, aggregate_method)
+        self._compact = compact
+        self._variables = []
+        self._rows = {}  # row-columns shared by all variables, see _add_rows
+        # file with the data-lines when loading variables lazily
+        self._source = None
+        self._spool = None
+        # timings and counters of the ingest
+        self.stats = ReaderStats(stats_callback)
+
+        if incremental and cache_dir is None:
+            raise Exception("incremental updates need a cache_dir")
+        if aggregate is not None:
+            if aggregate not in PERIODS or aggregate_method not in METHODS:
+                raise Exception(
+                    f"unknown aggregation {aggregate}/{aggregate_method}, use one of "
+                    f"{list(PERIODS)} and {METHODS}"
+                )
+            if incremental:
+                raise Exception("incremental updates of aggregated data not supported")
+        # skip lines outside of the filters before parsing
+        self._line_filter = LineFilter(
+            self._get_filters(),
+            self.SITE_NAME,
+            self.DATE_NAME,
+            self.LAT_NAME,
+            self.LON_NAME,
+            TS_TYPE_DIFFS[ts_type],
+        )
+
+        line_filter = self._line_filter
+        # last time of each site of an incremental update
+        after = None
+        if cache_dir is not None:
+            cache = DataCache(cache_dir, cache_max_bytes)
+            cache_key = cache.key(
+                self.__class__.__name__,
+                self._filename,
+                ts_type,
+                fill_country_flag,
+                self._line_filter.key(),
+                self._aggregate,
+            )
+            cache_validator = cache.validator(self._filename)
+            with self.stats.phase(CACHE_LOAD):
+                cached = cache.load(cache_key, cache_validator, compact=compact)
+            if cached is not None:
+                self._data, self._stations, extra = cached
+                self._variables = list(self._data.keys())
+                self._header = extra["header"]
+                self._fields = extra["fields"]
+                return
+            if incremental:
+                with self.stats.phase(CACHE_LOAD):
+                    previous = cache.load(cache_key, cache_validator, outdated=True)
+                if previous is not None and "last_times" in previous[2]:
+                    self._data, self._stations, extra = previous
+                    self._variables = list(self._data.keys())
+                    after = {
+                        site: np.datetime64(last)
+                        for site, last in extra["last_times"].items()
+                    }
+                    line_filter = self._line_filter.updating(after)
+                    # new rows are appended to the uncompacted data of all variables
+                    self._compact = False
+                    lazy = False
+
+        float_columns = [self.LAT_NAME, self.LON_NAME, self.ALT_NAME]
+        if lazy:
+            if needs_spool(self._filename):
+                self._spool = tempfile.NamedTemporaryFile(
+                    "w+", encoding="utf-8", suffix=".csv"
+                )
+                self._source = self._spool.name
+            else:
+                self._source = self._filename
+        else:
+            float_columns += self._read_vars()
+        encoder = ColumnEncoder(self.SITE_NAME, self.DATE_NAME, self.TIME_NAME)
+        self._header, self._fields, columns = read_file(
+            self._filename,
+            self.HEADER_LINE_NO,
+            [self.SITE_NAME, self.DATE_NAME, self.TIME_NAME],
+            float_columns,
+            self._backend,
+            tqdm_desc,
+            file_mask=self.FILE_MASK,
+            max_workers=max_workers,
+            spool=self._spool,
+            line_filter=line_filter,
+            stats=self.stats,
+            chunk_rows=chunk_rows,
+            encoder=encoder,
+        )
+        site_names = encoder.site_names()
+        if after is not None:
+            # the line filter skips only whole days
+            keep = newer_rows(site_names[columns[SITE_CODES]], columns[TIMES], after)
+            self.stats.count(FILTERED_ROWS, int(np.sum(~keep)))
+            columns = {name: column[keep] for name, column in columns.items()}
+        with self.stats.phase(ROW_PARSE):
+            self._add_rows(columns, site_names, fill_country_flag, ts_type)
+        if not lazy:
+            with self.stats.phase(ASSEMBLE):
+                self._add_variables(columns, self._variables)
+        if cache_dir is not None:
+            # the cache contains all variables
+            for variable in self._variables:
+                self._unfiltered_data(variable)
+            cache.store(
+                cache_key,
+                cache_validator,
+                self._data,
+                self._stations,
+                {
+                    "header": self._header,
+                    "fields": self._fields,
+                    "last_times": self._last_times(ts_type),
+                },
+            )
+            if compact and not self._compact:
+                self._compact = True
+                for variable, da in self._data.items():
+                    self._data[variable] = compact_structured(da, self._stations)
+
+    def _last_times(self, ts_type) -> dict[str, str]:
+        """last time of each site in the data, as stored in the cache for incremental updates"""
+        if not self._data:
+            return {}
+        da = next(iter(self._data.values()))
+        times = last_times(da.stations, da.start_times + TS_TYPE_DIFFS[ts_type])
+        return {site: str(last) for site, last in times.items()}
+
+    def _read_vars(self) -> list[str]:
+        """variables in DATA_VARS which are read from the file, i.e. not computed"""
+        return [var for var in self.DATA_VARS if var not in self.COMPUTED_VARS]
+
+    def _add_rows(self, columns, site_names, fill_country_flag, ts_type):
+        """create stations and the row-columns (station, coordinates, times) shared by all variables
+
+        :param columns: dict of column-name -> numpy array, as returned by read_file with
+            a ColumnEncoder
+        :param site_names: names of the SITE_CODES, see ColumnEncoder.site_names
+        :param fill_country_flag:
+        :param ts_type:
+        """
+        codes = columns[SITE_CODES]
+        # every line contains all variables, sometimes filled with NaNs though;
+        # the variables are empty if no data-line is within the filters
+        self._variables = list(self.DATA_VARS)
+
+        # coordinates are taken from the first row of each block of station-rows
+        block_starts, block_idx = station_blocks(codes)
+        lats = columns[self.LAT_NAME][block_idx]
+        lons = columns[self.LON_NAME][block_idx]
+        alts = columns[self.ALT_NAME][block_idx]
+
+        # first row of each station not seen before
+        new_rows = {}
+        for _ridx in block_starts:
+            station = str(site_names[codes[_ridx]])
+            if station not in self._stations and station not in new_rows:
+                new_rows[station] = _ridx
+        coordinates = [
+            (float(lats[_ridx]), float(lons[_ridx])) for _ridx in new_rows.values()
+        ]
+        if fill_country_flag:
+            with self.stats.phase(GEOCODING):
+                countries = lookup_countries(coordinates)
+        else:
+            countries = [NO_COUNTRY] * len(coordinates)
+        for (station, _ridx), (lat, lon), country in zip(
+            new_rows.items(), coordinates, countries
+        ):
+            self._stations[station] = Station(
+                {
+                    "station": station,
+                    "longitude": lon,
+                    "latitude": lat,
+                    "altitude": float(alts[_ridx]),
+                    "country": country,
+                    "url": "",
+                    "long_name": station,
+                }
+            )
+
+        time_dummy = columns[TIMES]
+        self._rows = {
+            "start_times": time_dummy - TS_TYPE_DIFFS[ts_type],
+            "end_times": time_dummy + TS_TYPE_DIFFS[ts_type],
+        }
+        if self._compact:
+            # coordinates are taken from the station table
+            self._rows["station_ids"] = station_ids(
+                site_names, station_table_from_stations(self._stations)
+            )[codes]
+        else:
+            self._rows["stations"] = site_names[codes]
+            self._rows["latitudes"] = lats
+            self._rows["longitudes"] = lons
+            self._rows["altitudes"] = alts
+
+    def _add_variables(self, columns, variables: list[str]):
+        """create the data of variables from the read columns
+
+        :param columns: dict of column-name -> numpy array, containing the read variables
+            needed for variables
+        :param variables: variables to create
+        """
+        values = {}
+        for variable in columns:
+            if variable in self.DATA_VARS:
+                value = columns[variable]
+                values[variable] = np.where(value == NAN_VAL, np.nan, value)
+        with self.stats.phase(DERIVED_VARIABLES):
+            self._compute_vars(values)
+
+        # units of Aeronet data are always 1
+        units = "1"
+        row_no = len(self._rows["start_times"])
+        flags = np.full(row_no, Flag.VALID, dtype="i2")
+        standard_deviations = np.full(row_no, np.nan)
+        if self._compact:
+            table = station_table_from_stations(self._stations)
+        template = None
+        for variable in variables:
+            da = None
+            if variable in self._data:
+                da = self._data[variable]
+                if da.units != units:
+                    raise Exception(f"unit change from '{da.units}' to 'units'")
+            rows, value, stds = self._rows, values[variable], standard_deviations
+            if self._aggregate is not None:
+                with self.stats.phase(AGGREGATE):
+                    rows, value, stds = self._aggregated(value)
+                flags = np.full(len(value), Flag.VALID, dtype="i2")
+            if self._compact:
+                self._data[variable] = compact_data(
+                    variable,
+                    units,
+                    value,
+                    rows["station_ids"],
+                    table,
+                    rows["start_times"],
+                    rows["end_times"],
+                    flags,
+                    stds,
+                    da,
+                )
+            else:
+                if template is None or self._aggregate is not None:
+                    # the aggregated rows differ between the variables
+                    template = row_template(
+                        rows["stations"],
+                        rows["latitudes"],
+                        rows["longitudes"],
+                        rows["altitudes"],
+                        rows["start_times"],
+                        rows["end_times"],
+                        flags,
+                        stds,
+                    )
+                self._data[variable] = structured_data(
+                    variable, units, template, value, da
+                )
+
+    def _aggregated(self, values: np.ndarray):
+        """aggregate values of the row-columns to the periods of the aggregate option
+
+        :return: tuple of aggregated row-columns, values and standard deviations
+        """
+        key = "station_ids" if self._compact else "stations"
+        first, start_times, end_times, values, stds = aggregate(
+            self._rows[key],
+            self._rows["start_times"],
+            self._rows["end_times"],
+            values,
+            *self._aggregate,
+        )
+        rows = {name: column[first] for name, column in self._rows.items()}
+        rows["start_times"] = start_times
+        rows["end_times"] = end_times
+        return rows, values, stds
+
+    def _compute_vars(self, values: dict[str, np.ndarray]):
+        """add the COMPUTED_VARS to values, calculated over the full arrays of read variables
+
+        computed variables are skipped if the needed read variables are not in values
+        """
+        for variable, args in self.COMPUTED_VARS.items():
+            to_lambda, od_ref, lambda_ref, angstrom = args
+            if od_ref in values and angstrom in values:
+                values[variable] = self.compute_od_from_angstromexp(
+                    to_lambda, values[od_ref], lambda_ref, values[angstrom]
+                )
+
+    def _load_variable(self, varname):
+        """parse a single variable from the source, used when loading lazily
+
+        The whole source is parsed again for each variable. The times of its phases are added
+        to the reader's stats, its rows are only counted as LAZY_ROWS, so the ingest counters
+        keep describing the opening.
+        """
+        if varname in self.COMPUTED_VARS:
+            _, od_ref, _, angstrom = self.COMPUTED_VARS[varname]
+            read_vars = [od_ref, angstrom]
+        else:
+            read_vars = [varname]
+
+        def forward(kind, name, value):
+            if kind == "time":
+                self.stats.add_time(name, value)
+            elif name == ROWS:
+                self.stats.count(LAZY_ROWS, value)
+
+        _, _, columns = read_file(
+            self._source,
+            self.HEADER_LINE_NO,
+            [],
+            read_vars,
+            self._backend,
+            self._tqdm_desc,
+            line_filter=self._line_filter,
+            stats=ReaderStats(forward),
+            chunk_rows=self._chunk_rows,
+        )
+        with self.stats.phase(ASSEMBLE):
+            self._add_variables(columns, [varname])
+
+    def data(self, varname) -> Data:
+        for fi in self._get_filters():
+            if isinstance(fi, VariableNameFilter):
+                varname = fi.reader_varname(varname)
+        return apply_filters(
+            self.stats,
+            self._get_filters(),
+            self._unfiltered_data(varname),
+            self._unfiltered_stations(),
+            self._unfiltered_variables(),
+        )
+
+    def _unfiltered_data(self, varname) -> Data:
+        if varname not in self._data and varname in self._variables:
+            self._load_variable(varname)
+        return self._data[varname]
+
+    def _unfiltered_stations(self) -> dict[str, Station]:
+        return self._stations
+
+    def _unfiltered_variables(self) -> list[str]:
+        return list(self._variables)
+
+    def close(self):
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
+    def compute_od_from_angstromexp(
+        self, to_lambda: float, od_ref: float, lambda_ref: float, angstrom_coeff: float
+    ) -> float:
+        """Compute AOD at specified wavelength
+
+        Uses Angstrom coefficient and reference AOD to compute the
+        corresponding wavelength shifted AOD
+
+        Parameters
+        ----------
+        to_lambda : :obj:`float` or :obj:`ndarray`
+            wavelength for which AOD is calculated
+        od_ref : :obj:`float` or :obj:`ndarray`
+            reference AOD
+        lambda_ref : :obj:`float` or :obj:`ndarray`
+            wavelength corresponding to reference AOD
+        angstrom_coeff : :obj:`float` or :obj:`ndarray`
+            Angstrom coefficient
+
+        Returns
+        -------
+        :obj:`float` or :obj:`ndarray`
+            AOD(s) at shifted wavelength
+
+        """
+        return od_ref * (lambda_ref / to_lambda) ** angstrom_coeff
+
+    def is_valid_url(self, url):
+        return is_valid_url(url)
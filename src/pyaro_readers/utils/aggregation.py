@@ -0,0 +1,74 @@
+"""Temporal aggregation of rows to periods while reading
+
+Rows are assigned to the period containing the middle of their start- and end-time, grouped
+by station and period with a single sort, and reduced per group with numpy's reduceat, so
+only the aggregated rows are kept by the readers.
+"""
+
+import numpy as np
+
+# period -> numpy datetime unit
+PERIODS = {"daily": "D", "monthly": "M", "yearly": "Y"}
+METHODS = ["mean", "median", "count"]
+
+
+def aggregate(
+    keys: np.ndarray,
+    start_times: np.ndarray,
+    end_times: np.ndarray,
+    values: np.ndarray,
+    period: str,
+    method: str = "mean",
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """aggregate the finite values of each station and period
+
+    :param keys: station of each row, e.g. station names or station-ids
+    :param start_times: start-time of each row
+    :param end_times: end-time of each row
+    :param values: value of each row, rows with NaN are ignored
+    :param period: one of PERIODS
+    :param method: one of METHODS, count gives the number of finite values
+    :return: tuple of the first input row of each group (to take the station and coordinates
+        from), the start- and end-times of the periods, the aggregated values and the standard
+        deviations of the values of each group; sorted by station and period
+    """
+    unit = PERIODS[period]
+    valid = np.flatnonzero(np.isfinite(values))
+    middle = start_times[valid] + (end_times[valid] - start_times[valid]) // 2
+    periods = middle.astype(f"datetime64[{unit}]")
+    vals = values[valid]
+    # sorted by value within the groups for the median
+    order = np.lexsort((vals, periods, keys[valid]))
+    rows = valid[order]
+    periods = periods[order]
+    vals = vals[order].astype("f8")
+    group_keys = keys[rows]
+
+    row_no = len(rows)
+    if row_no == 0:
+        empty_times = np.empty(0, dtype="datetime64[s]")
+        return rows, empty_times, empty_times, vals, vals
+    new_group = np.ones(row_no, dtype=bool)
+    new_group[1:] = (group_keys[1:] != group_keys[:-1]) | (periods[1:] != periods[:-1])
+    starts = np.flatnonzero(new_group)
+    counts = np.diff(np.append(starts, row_no))
+
+    means = np.add.reduceat(vals, starts) / counts
+    deviations = (vals - np.repeat(means, counts)) ** 2
+    stds = np.sqrt(np.add.reduceat(deviations, starts) / counts)
+    if method == "mean":
+        result = means
+    elif method == "median":
+        result = (vals[starts + (counts - 1) // 2] + vals[starts + counts // 2]) / 2
+    elif method == "count":
+        result = counts.astype("f8")
+    else:
+        raise ValueError(f"unknown aggregation method {method}, use one of {METHODS}")
+    period_starts = periods[starts]
+    return (
+        rows[starts],
+        period_starts.astype("datetime64[s]"),
+        (period_starts + 1).astype("datetime64[s]"),
+        result,
+        stds,
+    )
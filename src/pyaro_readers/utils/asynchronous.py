@@ -0,0 +1,62 @@
+"""Opening readers from asyncio code
+
+Opening a reader downloads and parses the whole source, which would block an event loop for
+seconds to minutes. open_async runs the opening in a worker thread of the event loop's default
+executor, so several sources can be downloaded and parsed at the same time while the loop keeps
+serving. The downloads use blocking requests in the worker thread; numpy parsing and netcdf
+reads release the GIL for most of their time, and the process pools of the readers
+(max_workers) are used as when opening synchronously.
+
+Cancelling the awaiting task stops the opening at the next phase timing or counter update of
+the reader's stats (see utils.stats), i.e. after the current chunk, and closes the reader if
+it was opened nevertheless.
+"""
+
+import asyncio
+import threading
+
+
+class OpenCancelled(Exception):
+    """raised in the worker thread to stop opening a reader after the task was cancelled"""
+
+    pass
+
+
+async def open_async(open_reader, *args, **kwargs):
+    """await open_reader(*args, **kwargs) in a worker thread
+
+    :param open_reader: function opening the reader, e.g. an engine's open, it must accept
+        a stats_callback keyword
+    :param kwargs: keyword arguments of open_reader, a stats_callback is still called
+    :return: the reader
+    """
+    cancelled = threading.Event()
+    lock = threading.Lock()
+    opened = []
+    callback = kwargs.pop("stats_callback", None)
+
+    def stats_callback(kind, name, value):
+        if cancelled.is_set():
+            raise OpenCancelled("opening cancelled")
+        if callback is not None:
+            callback(kind, name, value)
+
+    def run():
+        reader = open_reader(*args, stats_callback=stats_callback, **kwargs)
+        with lock:
+            if cancelled.is_set():
+                reader.close()
+                raise OpenCancelled("opening cancelled")
+            opened.append(reader)
+        return reader
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(None, run)
+    except asyncio.CancelledError:
+        with lock:
+            cancelled.set()
+            # opened, but the task was cancelled before receiving the reader
+            for reader in opened:
+                reader.close()
+        raise
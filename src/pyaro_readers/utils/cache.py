@@ -0,0 +1,255 @@
+"""On-disk cache of parsed reader data
+
+Each cache entry is a single .npz-file with the data of all variables and the stations of one
+source. Station names are stored once and referenced by index from the data-rows. An entry is
+only valid as long as the source is unchanged, which is checked with the HTTP ETag or
+Last-Modified header for URLs, and with the modification time and size for local files.
+The least recently used entries are removed when the cache grows beyond its maximum size.
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+import numpy as np
+import requests
+from pyaro.timeseries import NpStructuredData, Station
+
+from .data import compact_data, station_table
+from .download import is_valid_url, session
+
+logger = logging.getLogger(__name__)
+
+# increase when the layout of the cache-files changes
+CACHE_VERSION = 1
+CACHE_MAX_BYTES = 10 * 1024**3
+
+_STATION_FIELDS = [
+    "station",
+    "latitude",
+    "longitude",
+    "altitude",
+    "country",
+    "url",
+    "long_name",
+]
+
+
+def user_cache_dir() -> str:
+    """directory for caches shared by all readers, $XDG_CACHE_HOME/pyaro_readers or ~/.cache/pyaro_readers"""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "pyaro_readers")
+
+
+class DataCache:
+    def __init__(self, directory: str, max_bytes: int = CACHE_MAX_BYTES):
+        """a directory with cached reader data
+
+        :param directory: cache directory, created if not existing
+        :param max_bytes: maximum size of all entries in the directory
+        """
+        self._directory = directory
+        self._max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, *parts) -> str:
+        """unique key of an entry, built from the source and all options changing the data"""
+        text = json.dumps([CACHE_VERSION] + [str(part) for part in parts])
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def validator(self, filename) -> [str, None]:
+        """identifier of the current version of the source
+
+        :param filename: URL or path of the source
+        :return: a string changing with the source, None if the version cannot be determined
+        """
+        if is_valid_url(filename):
+            try:
+                r = session().head(filename, allow_redirects=True)
+                r.raise_for_status()
+            except requests.RequestException as ex:
+                logger.info(f"cannot validate cache for {filename}: {ex}")
+                return None
+            if "ETag" in r.headers:
+                return f"etag:{r.headers['ETag']}"
+            if "Last-Modified" in r.headers:
+                length = r.headers.get("Content-Length", "")
+                return f"modified:{r.headers['Last-Modified']}:{length}"
+            return None
+        st = os.stat(filename)
+        return f"file:{st.st_mtime_ns}:{st.st_size}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, f"{key}.npz")
+
+    def load(
+        self,
+        key: str,
+        validator: [str, None],
+        compact: bool = False,
+        outdated: bool = False,
+    ):
+        """read an entry
+
+        :param key: key of the entry
+        :param validator: current validator of the source
+        :param compact: return the data as DataStationIdStructured instead of NpStructuredData,
+            see utils.data
+        :param outdated: return the entry even if the source has changed since, e.g. to update
+            it incrementally
+        :return: None if the entry does not exist or is outdated, otherwise a tuple of
+            data (dict of variable -> NpStructuredData), stations (dict of name -> Station)
+            and the extra dict given to store
+        """
+        path = self._path(key)
+        if not os.path.exists(path) or (validator is None and not outdated):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                meta = json.loads(str(npz["meta"]))
+                if meta["validator"] != validator and not outdated:
+                    return None
+                station_names = npz["station_names"]
+                data = {}
+                for i, (variable, units) in enumerate(meta["variables"]):
+                    rows = npz[f"data_{i}"]
+                    if compact:
+                        data[variable] = self._compact_data(
+                            variable, units, rows, station_names
+                        )
+                        continue
+                    da = NpStructuredData(variable, units)
+                    da.append(
+                        rows["values"],
+                        station_names[rows["station_idx"]],
+                        rows["latitudes"],
+                        rows["longitudes"],
+                        rows["altitudes"],
+                        rows["start_times"],
+                        rows["end_times"],
+                        rows["flags"],
+                        rows["standard_deviations"],
+                    )
+                    data[variable] = da
+        except (OSError, ValueError, KeyError) as ex:
+            logger.warning(f"ignoring broken cache-file {path}: {ex}")
+            return None
+        stations = {
+            station["station"]: Station(station) for station in meta["stations"]
+        }
+        # mark as recently used
+        os.utime(path)
+        return data, stations, meta["extra"]
+
+    @staticmethod
+    def _compact_data(variable, units, rows, station_names):
+        # coordinates of each station from its first row
+        ids, first = np.unique(rows["station_idx"], return_index=True)
+        table = station_table(
+            station_names[ids],
+            rows["latitudes"][first],
+            rows["longitudes"][first],
+            rows["altitudes"][first],
+        )
+        return compact_data(
+            variable,
+            units,
+            rows["values"],
+            np.searchsorted(ids, rows["station_idx"]),
+            table,
+            rows["start_times"],
+            rows["end_times"],
+            rows["flags"],
+            rows["standard_deviations"],
+        )
+
+    def store(
+        self,
+        key: str,
+        validator: [str, None],
+        data: dict,
+        stations: dict,
+        extra: [dict, None] = None,
+    ):
+        """write an entry and remove the least recently used entries if the cache is full
+
+        :param key: key of the entry
+        :param validator: validator of the source the data has been read from,
+            nothing is stored if None
+        :param data: dict of variable -> NpStructuredData
+        :param stations: dict of name -> Station
+        :param extra: additional json-serializable information
+        """
+        if validator is None:
+            return
+        names = sorted(
+            set(stations.keys()).union(
+                *[np.unique(da.stations) for da in data.values()]
+            )
+        )
+        station_names = np.array(names, dtype="U64")
+        arrays = {"station_names": station_names}
+        for i, da in enumerate(data.values()):
+            rows = np.empty(
+                len(da),
+                dtype=[
+                    ("values", "f4"),
+                    ("station_idx", "i4"),
+                    ("latitudes", "f4"),
+                    ("longitudes", "f4"),
+                    ("altitudes", "f4"),
+                    ("start_times", "datetime64[s]"),
+                    ("end_times", "datetime64[s]"),
+                    ("flags", "i2"),
+                    ("standard_deviations", "f4"),
+                ],
+            )
+            for field in rows.dtype.names:
+                if field != "station_idx":
+                    rows[field] = da[field]
+            rows["station_idx"] = np.searchsorted(station_names, da.stations)
+            arrays[f"data_{i}"] = rows
+        meta = {
+            "validator": validator,
+            "variables": [(da.variable, da.units) for da in data.values()],
+            "stations": [
+                {field: stat[field] for field in _STATION_FIELDS}
+                for stat in stations.values()
+            ],
+            "extra": extra or {},
+        }
+        arrays["meta"] = np.array(json.dumps(meta))
+        fd, tmp = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                np.savez(fh, **arrays)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self._evict(keep=self._path(key))
+
+    def _evict(self, keep: str):
+        entries = []
+        for path in glob.glob(os.path.join(self._directory, "*.npz")):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self._max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -0,0 +1,165 @@
+"""Creation of reader data from column arrays
+
+pyaro's NpStructuredData stores the station name (U64, 256 bytes) and the coordinates on
+every row. DataStationIdStructured keeps only an integer station-id per row and the names
+and coordinates once in a station table; the full per-row arrays are only expanded when
+accessed, e.g. data.stations or data.latitudes.
+
+Both are built here from complete columns with a single allocation, instead of growing
+them row by row or array by array with append.
+"""
+
+import numpy as np
+from pyaro.timeseries import NpStructuredData, Station
+from pyaro.timeseries.DataStationIdStructured import DataStationIdStructured
+
+STATION_DTYPE = [
+    ("stations", "U64"),
+    ("latitudes", "f"),
+    ("longitudes", "f"),
+    ("altitudes", "f"),
+]
+ROW_DTYPE = [
+    ("values", "f"),
+    ("station_ids", "u4"),
+    ("start_times", "datetime64[s]"),
+    ("end_times", "datetime64[s]"),
+    ("flags", "i2"),
+    ("standard_deviations", "f"),
+]
+
+
+def station_table(names, latitudes, longitudes, altitudes) -> np.ndarray:
+    """structured array with one row per station, the station-id is the row-number"""
+    table = np.empty(len(names), dtype=STATION_DTYPE)
+    table["stations"] = names
+    table["latitudes"] = latitudes
+    table["longitudes"] = longitudes
+    table["altitudes"] = altitudes
+    return table
+
+
+def station_table_from_stations(stations: dict[str, Station]) -> np.ndarray:
+    """station table of a reader's stations, in the order of the dict"""
+    return station_table(
+        list(stations.keys()),
+        [stat.latitude for stat in stations.values()],
+        [stat.longitude for stat in stations.values()],
+        [stat.altitude for stat in stations.values()],
+    )
+
+
+def station_ids(names: np.ndarray, table: np.ndarray) -> np.ndarray:
+    """station-ids of the per-row station names, names must be in the table"""
+    unique_names, inverse = np.unique(names, return_inverse=True)
+    index = {name: i for i, name in enumerate(table["stations"])}
+    ids = np.array([index[name] for name in unique_names], dtype="u4")
+    return ids[inverse]
+
+
+def compact_data(
+    variable: str,
+    units: str,
+    values: np.ndarray,
+    station_ids: np.ndarray,
+    table: np.ndarray,
+    start_times: np.ndarray,
+    end_times: np.ndarray,
+    flags: np.ndarray,
+    standard_deviations: np.ndarray,
+    data: [DataStationIdStructured, None] = None,
+) -> DataStationIdStructured:
+    """create DataStationIdStructured from column arrays in a single allocation
+
+    :param station_ids: per-row index into table
+    :param table: station table, see station_table
+    :param data: existing data to extend, must use the same table
+    :return: new data
+    """
+    rows = np.empty(len(values), dtype=ROW_DTYPE)
+    rows["values"] = values
+    rows["station_ids"] = station_ids
+    rows["start_times"] = start_times
+    rows["end_times"] = end_times
+    rows["flags"] = flags
+    rows["standard_deviations"] = standard_deviations
+    if data is not None and len(data) > 0:
+        rows = np.concatenate([data._data.data, rows])
+    da = DataStationIdStructured(variable, units)
+    da.set_data(
+        variable,
+        units,
+        rows,
+        table,
+        {name: i for i, name in enumerate(table["stations"])},
+    )
+    return da
+
+
+def compact_structured(
+    data: NpStructuredData, stations: dict[str, Station]
+) -> DataStationIdStructured:
+    """convert NpStructuredData to DataStationIdStructured with the reader's stations as table"""
+    table = station_table_from_stations(stations)
+    return compact_data(
+        data.variable,
+        data.units,
+        data.values,
+        station_ids(data.stations, table),
+        table,
+        data.start_times,
+        data.end_times,
+        data.flags,
+        data.standard_deviations,
+    )
+
+
+def row_template(
+    stations: np.ndarray,
+    latitudes: np.ndarray,
+    longitudes: np.ndarray,
+    altitudes: np.ndarray,
+    start_times: np.ndarray,
+    end_times: np.ndarray,
+    flags: np.ndarray,
+    standard_deviations: np.ndarray,
+) -> np.ndarray:
+    """rows of NpStructuredData without values, shared by all variables of the same rows
+
+    Converting the columns, e.g. the station names to U64, is done only once, see
+    structured_data.
+    """
+    rows = np.empty(len(stations), dtype=NpStructuredData._dtype)
+    rows["values"] = np.nan
+    rows["stations"] = stations
+    rows["latitudes"] = latitudes
+    rows["longitudes"] = longitudes
+    rows["altitudes"] = altitudes
+    rows["start_times"] = start_times
+    rows["end_times"] = end_times
+    rows["flags"] = flags
+    rows["standard_deviations"] = standard_deviations
+    return rows
+
+
+def structured_data(
+    variable: str,
+    units: str,
+    template: np.ndarray,
+    values: np.ndarray,
+    data: [NpStructuredData, None] = None,
+) -> NpStructuredData:
+    """create NpStructuredData from a row_template and the values
+
+    :param template: rows, see row_template
+    :param values: values of the rows
+    :param data: existing data to extend
+    :return: new data
+    """
+    rows = template.copy()
+    rows["values"] = values
+    if data is not None and len(data) > 0:
+        rows = np.concatenate([data._data.data, rows])
+    da = NpStructuredData(variable, units)
+    da.set_data(variable, units, rows)
+    return da
@@ -0,0 +1,297 @@
+"""Streaming access to remote or local (archive-)files
+
+The data is not held in memory as a whole: bytes are read from the HTTP response or the
+file in chunks, decompressed on the fly and handed over as a stream.
+
+All HTTP requests use one requests.Session, keeping connections to the same host alive.
+Failed requests are retried with exponential backoff, and a download interrupted after its
+start is resumed with a Range request at the last byte read, so a dropped connection does
+not restart a download of several hundred MB.
+"""
+
+import io
+import logging
+import struct
+import tarfile
+import threading
+import time
+import zlib
+from contextlib import closing, contextmanager
+from urllib.parse import urlparse
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .stats import TimedRawStream
+
+logger = logging.getLogger(__name__)
+
+# bytes requested per read from the HTTP response or file
+CHUNK_SIZE = 1024 * 1024
+# attempts after a failed request or an interrupted download
+RETRIES = 5
+# seconds to wait before the first retry, doubled for each further retry
+BACKOFF = 0.5
+RETRY_STATUS = (429, 500, 502, 503, 504)
+# connections kept alive per host
+POOL_SIZE = 10
+
+ZIP_MAGIC = b"PK\x03\x04"
+TAR_MAGIC = b"ustar"
+TAR_MAGIC_OFFSET = 257
+# compressions supported by tarfile
+COMPRESSION_MAGICS = [b"\x1f\x8b", b"BZh", b"\xfd7zXZ\x00"]
+
+_ZIP_LOCAL_HEADER = struct.Struct("<4sHHHHHIIIHH")
+_ZIP_STORED = 0
+_ZIP_DEFLATED = 8
+_ZIP_DATA_DESCRIPTOR_FLAG = 0x08
+
+
+class DownloadException(Exception):
+    pass
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def session() -> requests.Session:
+    """the requests.Session shared by all downloads, retrying failed requests"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=RETRIES,
+                backoff_factor=BACKOFF,
+                status_forcelist=RETRY_STATUS,
+                allowed_methods=("GET", "HEAD"),
+            )
+            adapter = HTTPAdapter(
+                pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry
+            )
+            _session = requests.Session()
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+    return _session
+
+
+def is_valid_url(url) -> bool:
+    try:
+        result = urlparse(url)
+        return all([result.scheme, result.netloc])
+    except ValueError:
+        return False
+
+
+class ResumableHTTPStream(io.RawIOBase):
+    """raw stream of a URL, resuming the download after a dropped connection
+
+    The download is continued with a Range request from the last byte read, as long as the
+    source is unchanged since the first request (If-Range). If the server does not support
+    ranges or the content is transfer-encoded, the download restarts and the bytes already
+    read are skipped.
+    """
+
+    def __init__(self, url: str, retries: int = RETRIES, backoff: float = BACKOFF):
+        self._url = url
+        self._retries = retries
+        self._backoff = backoff
+        self._pos = 0
+        self._response = self._get({})
+        headers = self._response.headers
+        self._validator = headers.get("ETag", headers.get("Last-Modified"))
+        self._ranges = (
+            headers.get("Accept-Ranges") == "bytes"
+            and headers.get("Content-Encoding", "identity") == "identity"
+        )
+
+    def _get(self, headers: dict) -> requests.Response:
+        r = session().get(self._url, stream=True, headers=headers)
+        r.raise_for_status()
+        # transparently decode a Content-Encoding: gzip transfer
+        r.raw.decode_content = True
+        return r
+
+    def _resume(self):
+        self._response.close()
+        headers = {}
+        if self._ranges:
+            headers["Range"] = f"bytes={self._pos}-"
+            if self._validator is not None:
+                headers["If-Range"] = self._validator
+        r = self._get(headers)
+        if r.status_code == 206:
+            if not r.headers.get("Content-Range", "").startswith(f"bytes {self._pos}-"):
+                r.close()
+                raise DownloadException(f"unexpected range resuming {self._url}")
+        else:
+            skip = self._pos
+            while skip > 0:
+                data = r.raw.read(min(skip, CHUNK_SIZE))
+                if not data:
+                    r.close()
+                    raise DownloadException(f"{self._url} changed while reading")
+                skip -= len(data)
+        self._response = r
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        for attempt in range(self._retries + 1):
+            try:
+                if attempt > 0:
+                    self._resume()
+                data = self._response.raw.read(len(b))
+                break
+            except (requests.RequestException, urllib3.exceptions.HTTPError) as ex:
+                if attempt == self._retries:
+                    raise DownloadException(f"download of {self._url} failed: {ex}")
+                wait = self._backoff * 2**attempt
+                logger.info(
+                    f"resuming {self._url} at byte {self._pos} in {wait}s after: {ex}"
+                )
+                time.sleep(wait)
+        n = len(data)
+        b[:n] = data
+        self._pos += n
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._response.close()
+        super().close()
+
+
+@contextmanager
+def open_stream(filename, chunk_size: int = CHUNK_SIZE, stats=None):
+    """open a URL or a local file as buffered binary stream
+
+    :param filename: URL or path
+    :param chunk_size: buffer size
+    :param stats: ReaderStats receiving the time and bytes of reading the source
+    :return: io.BufferedReader, closed when leaving the context
+    """
+    if is_valid_url(filename):
+        with closing(ResumableHTTPStream(filename)) as http:
+            raw = http if stats is None else TimedRawStream(http, stats)
+            yield io.BufferedReader(raw, buffer_size=chunk_size)
+    elif stats is not None:
+        with open(filename, "rb", buffering=0) as fh:
+            yield io.BufferedReader(TimedRawStream(fh, stats), buffer_size=chunk_size)
+    else:
+        with open(filename, "rb", buffering=chunk_size) as fh:
+            yield fh
+
+
+def detect_format(stream: io.BufferedReader) -> str:
+    """detect the format of a stream from its magic bytes without consuming it
+
+    :param stream: a stream supporting peek
+    :return: "zip", "tar" or "text"
+    """
+    head = stream.peek(TAR_MAGIC_OFFSET + len(TAR_MAGIC))
+    if head.startswith(ZIP_MAGIC):
+        return "zip"
+    for magic in COMPRESSION_MAGICS:
+        if head.startswith(magic):
+            return "tar"
+    if head[TAR_MAGIC_OFFSET : TAR_MAGIC_OFFSET + len(TAR_MAGIC)] == TAR_MAGIC:
+        return "tar"
+    return "text"
+
+
+class ZipMemberStream(io.RawIOBase):
+    """Decompressed stream of the first member of a zip-file, read from a non-seekable stream.
+
+    zipfile.ZipFile needs the central directory at the end of the archive, so it cannot read
+    from a stream. The local file header in front of each member contains all information
+    needed to decompress a deflated member on the fly.
+    """
+
+    def __init__(self, stream, chunk_size: int = CHUNK_SIZE):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        header = self._read_exact(_ZIP_LOCAL_HEADER.size)
+        (
+            magic,
+            _version,
+            flags,
+            method,
+            _time,
+            _date,
+            _crc,
+            compressed_size,
+            _size,
+            name_len,
+            extra_len,
+        ) = _ZIP_LOCAL_HEADER.unpack(header)
+        if magic != ZIP_MAGIC:
+            raise DownloadException("not a zip-file")
+        self.name = self._read_exact(name_len).decode("utf-8", errors="replace")
+        self._read_exact(extra_len)
+        if method == _ZIP_DEFLATED:
+            self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            self._remaining = None
+        elif method == _ZIP_STORED and not flags & _ZIP_DATA_DESCRIPTOR_FLAG:
+            self._decompressor = None
+            self._remaining = compressed_size
+        else:
+            raise DownloadException(
+                f"unsupported zip-compression {method} for streaming {self.name}"
+            )
+        self._buffer = b""
+        self._pos = 0
+
+    def _read_exact(self, size: int) -> bytes:
+        data = self._stream.read(size)
+        if len(data) != size:
+            raise DownloadException("unexpected end of zip-file")
+        return data
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while self._pos >= len(self._buffer):
+            if self._decompressor is None:
+                if self._remaining == 0:
+                    return 0
+                chunk = self._stream.read(min(self._chunk_size, self._remaining))
+                if not chunk:
+                    raise DownloadException("unexpected end of zip-file")
+                self._remaining -= len(chunk)
+                self._buffer = chunk
+                self._pos = 0
+            else:
+                if self._decompressor.eof:
+                    return 0
+                chunk = self._stream.read(self._chunk_size)
+                if not chunk:
+                    raise DownloadException("unexpected end of zip-file")
+                self._buffer = self._decompressor.decompress(chunk)
+                self._pos = 0
+        size = min(len(b), len(self._buffer) - self._pos)
+        b[:size] = self._buffer[self._pos : self._pos + size]
+        self._pos += size
+        return size
+
+
+def first_zip_member(stream, chunk_size: int = CHUNK_SIZE) -> io.BufferedReader:
+    """the decompressed first member of a zip-stream as buffered binary stream"""
+    return io.BufferedReader(ZipMemberStream(stream, chunk_size), chunk_size)
+
+
+def iter_tar_members(stream):
+    """iterate over the regular files of a (compressed) tar-stream
+
+    :param stream: non-seekable stream of a tar-file
+    :return: generator of (name, binary stream) of the members in archive order
+    """
+    with tarfile.open(fileobj=stream, mode="r|*") as tf:
+        for member in tf:
+            if member.isfile():
+                yield member.name, tf.extractfile(member)
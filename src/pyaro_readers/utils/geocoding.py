@@ -0,0 +1,102 @@
+"""Memoized reverse geocoding of station coordinates to countries
+
+Building the Natural Earth geocoder and looking up coordinates is expensive compared to
+reading a file, while the stations of a network rarely change. Countries are therefore
+looked up in batches of unique coordinates, and kept in memory and in a json-file on disk,
+shared by all readers and runs. The geocoder is only created if a lookup is not cached.
+"""
+
+import json
+import logging
+import os
+import tempfile
+
+from .cache import user_cache_dir
+
+logger = logging.getLogger(__name__)
+
+# country-code used when coordinates are not in any country
+NO_COUNTRY = "NN"
+# property of the Natural Earth countries used as country-code
+COUNTRY_PROPERTY = "ISO_A2_EH"
+
+_memory = {}  # cache-file -> dict of coordinate-key -> country
+_geocoder = None
+
+
+def default_cache_file() -> str:
+    """location of the persistent cache in the user_cache_dir"""
+    return os.path.join(user_cache_dir(), "countries.json")
+
+
+def _key(latitude: float, longitude: float) -> str:
+    return f"{latitude:.6f},{longitude:.6f}"
+
+
+def _get_geocoder():
+    global _geocoder
+    if _geocoder is None:
+        from geocoder_reverse_natural_earth import Geocoder_Reverse_NE
+
+        _geocoder = Geocoder_Reverse_NE()
+    return _geocoder
+
+
+def _load(cache_file: [str, None]) -> dict[str, str]:
+    if cache_file not in _memory:
+        countries = {}
+        if cache_file is not None and os.path.exists(cache_file):
+            try:
+                with open(cache_file, "r", encoding="utf-8") as fh:
+                    countries = json.load(fh)
+            except (OSError, ValueError) as ex:
+                logger.warning(f"ignoring broken geocoding cache {cache_file}: {ex}")
+        _memory[cache_file] = countries
+    return _memory[cache_file]
+
+
+def _store(cache_file: str, countries: dict[str, str]):
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        # merge with entries written meanwhile by other processes
+        if os.path.exists(cache_file):
+            with open(cache_file, "r", encoding="utf-8") as fh:
+                countries = {**json.load(fh), **countries}
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(cache_file), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(countries, fh)
+        os.replace(tmp, cache_file)
+    except (OSError, ValueError) as ex:
+        logger.warning(f"cannot write geocoding cache {cache_file}: {ex}")
+
+
+def lookup_countries(
+    coordinates: list[tuple[float, float]], cache_file: [str, None] = ""
+) -> list[str]:
+    """country-codes of coordinates
+
+    :param coordinates: list of (latitude, longitude)
+    :param cache_file: json-file with cached countries, "" for the default_cache_file(),
+        None to cache in memory only
+    :return: list of ISO2 country-codes, NO_COUNTRY for coordinates outside of all countries
+    """
+    if cache_file == "":
+        cache_file = default_cache_file()
+    countries = _load(cache_file)
+    missing = {
+        _key(lat, lon): (lat, lon)
+        for lat, lon in coordinates
+        if _key(lat, lon) not in countries
+    }
+    if missing:
+        from geocoder_reverse_natural_earth import Geocoder_Reverse_Exception
+
+        geocoder = _get_geocoder()
+        for key, (lat, lon) in missing.items():
+            try:
+                countries[key] = geocoder.lookup(lat, lon)[COUNTRY_PROPERTY]
+            except Geocoder_Reverse_Exception:
+                countries[key] = NO_COUNTRY
+        if cache_file is not None:
+            _store(cache_file, countries)
+    return [countries[_key(lat, lon)] for lat, lon in coordinates]
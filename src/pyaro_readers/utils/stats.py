@@ -0,0 +1,169 @@
+"""Timings and counters of the ingest of a reader
+
+Each reader has a ReaderStats in its stats attribute, collecting the time spent in the phases
+of reading (see the phase names below) and counters like rows, dropped, filtered rows and bytes
+read. The rows, dropped rows and bytes are those of opening a reader; re-reads of the source,
+e.g. by lazy loading, add their phase timings but count their rows as lazy rows only.
+Phases are exclusive: the time of a phase nested into another one, e.g. the download while
+decompressing a stream, is only counted for the inner phase. Work done in parallel workers is
+summed up, so the sum of the phases can exceed the wall-clock time.
+
+The results can be consumed as dict, logged, exported in the Prometheus text format, or
+followed live with a callback(kind, name, value), called with kind "time" and the seconds of
+each finished phase, and with kind "count" and the increment of a counter.
+"""
+
+import io
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from pyaro.timeseries import Data
+
+logger = logging.getLogger(__name__)
+
+# phases
+DOWNLOAD = "download"  # reading the raw bytes of a URL or file
+DECOMPRESS = "decompress"  # decompression, decoding and splitting into lines
+HEADER_PARSE = "header_parse"
+ROW_PARSE = "row_parse"  # conversion of data-lines to columns, times and stations
+DERIVED_VARIABLES = "derived_variables"
+GEOCODING = "geocoding"
+NETCDF_OPEN = "netcdf_open"  # opening netcdf-files including their time/station axes
+NETCDF_READ = "netcdf_read"
+ASSEMBLE = "assemble"  # building the Data-objects from columns
+AGGREGATE = "aggregate"  # temporal aggregation of the rows to periods
+CACHE_LOAD = "cache_load"
+FILTER = "filter"  # application of the reader's filters in data()
+
+# counters
+ROWS = "rows"  # data-rows read from the source
+DROPPED_ROWS = "dropped_rows"  # lines skipped before parsing
+FILTERED_ROWS = "filtered_rows"  # parsed rows removed by filters, per data() call
+LAZY_ROWS = "lazy_rows"  # rows parsed again by lazy loads of single variables
+BYTES_READ = "bytes_read"
+
+
+class ReaderStats:
+    def __init__(self, callback=None):
+        """collection of phase timings and counters
+
+        :param callback: function(kind, name, value) called for each finished phase with
+            kind "time" and for each counter-increment with kind "count"
+        """
+        self.timings = {}
+        self.counters = {}
+        self._callback = callback
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _notify(self, kind: str, name: str, value):
+        if self._callback is not None:
+            self._callback(kind, name, value)
+
+    def add_time(self, name: str, seconds: float):
+        with self._lock:
+            self.timings[name] = self.timings.get(name, 0.0) + seconds
+        self._notify("time", name, seconds)
+
+    def count(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+        self._notify("count", name, value)
+
+    @contextmanager
+    def phase(self, name: str):
+        """time the enclosed code as phase name, excluding nested phases"""
+        stack = self._local.__dict__.setdefault("stack", [])
+        start = time.perf_counter()
+        # [name, start, time of nested phases]
+        stack.append([name, start, 0.0])
+        try:
+            yield
+        finally:
+            _, _, nested = stack.pop()
+            elapsed = time.perf_counter() - start
+            if stack:
+                stack[-1][2] += elapsed
+            self.add_time(name, elapsed - nested)
+
+    def merge(self, other: dict):
+        """add the timings and counters of another as_dict(), e.g. from a worker process"""
+        for name, seconds in other["timings"].items():
+            self.add_time(name, seconds)
+        for name, value in other["counters"].items():
+            self.count(name, value)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {"timings": dict(self.timings), "counters": dict(self.counters)}
+
+    def log(self, log: logging.Logger = logger, level: int = logging.INFO):
+        """write timings and counters as a single log-message"""
+        stats = self.as_dict()
+        timings = ", ".join(f"{k}={v:.3f}s" for k, v in stats["timings"].items())
+        counters = ", ".join(f"{k}={v}" for k, v in stats["counters"].items())
+        log.log(level, f"timings: {timings}; counters: {counters}")
+
+    def prometheus(
+        self, prefix: str = "pyaro_reader", labels: [dict, None] = None
+    ) -> str:
+        """timings and counters in the Prometheus text exposition format
+
+        :param prefix: prefix of the metric names
+        :param labels: additional labels, e.g. {"engine": "aeronetsunreader"}
+        """
+        stats = self.as_dict()
+
+        def fmt(extra):
+            items = {**(labels or {}), **extra}
+            if not items:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in items.items()) + "}"
+
+        lines = [
+            f"# HELP {prefix}_phase_seconds time spent in the phases of reading",
+            f"# TYPE {prefix}_phase_seconds counter",
+        ]
+        for name, seconds in stats["timings"].items():
+            lines.append(f"{prefix}_phase_seconds{fmt({'phase': name})} {seconds}")
+        for name, value in stats["counters"].items():
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total{fmt({})} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class TimedRawStream(io.RawIOBase):
+    """raw stream timing all reads as DOWNLOAD and counting the BYTES_READ"""
+
+    def __init__(self, raw, stats: ReaderStats):
+        self._raw = raw
+        self._stats = stats
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        with self._stats.phase(DOWNLOAD):
+            data = self._raw.read(len(b))
+        n = len(data)
+        b[:n] = data
+        self._stats.count(BYTES_READ, n)
+        return n
+
+
+def apply_filters(
+    stats: ReaderStats, filters: list, data: Data, stations: dict, variables: list
+) -> Data:
+    """apply filters to data like AutoFilterReader.data(), timed as FILTER
+
+    :return: the filtered data, the removed rows are counted as FILTERED_ROWS
+    """
+    with stats.phase(FILTER):
+        length = len(data)
+        for fi in filters:
+            data = fi.filter_data(data, stations, variables)
+    if length > len(data):
+        stats.count(FILTERED_ROWS, length - len(data))
+    return data
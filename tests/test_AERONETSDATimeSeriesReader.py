@@ -1,9 +1,21 @@
+import asyncio
+import functools
+import http.server
+import io
+import tarfile
+import tempfile
+import threading
 import unittest
+import unittest.mock
 import urllib.request
 import os
+import zipfile
 
+import numpy as np
 import pyaro
 import pyaro.timeseries
+import pyaro_readers.utils.aeronet
+import pyaro_readers.utils.geocoding
 from pyaro.timeseries.Wrappers import VariableNameChangingReader
 
 TEST_URL = "https://pyaerocom.met.no/pyaro-suppl/testdata/aeronetsda_testdata.csv"
@@ -23,6 +35,44 @@ class TestAERONETTimeSeriesReader(unittest.TestCase):
         "aeronetsda_testdata.csv",
     )
 
+    @classmethod
+    def setUpClass(cls):
+        # serve the test-file as csv, zip and tar.gz (one file per station) from a local http-server
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        with open(cls.file, "rb") as fh:
+            lines = fh.readlines()
+        header, data = lines[:7], lines[7:]
+        with zipfile.ZipFile(
+            os.path.join(cls.tmpdir.name, "sda.csv.zip"), "w", zipfile.ZIP_DEFLATED
+        ) as zf:
+            zf.writestr("sda.csv", b"".join(lines))
+        with tarfile.open(os.path.join(cls.tmpdir.name, "sda.tar.gz"), "w:gz") as tf:
+            stations = {}
+            for line in data:
+                stations.setdefault(line.split(b",")[0], []).append(line)
+            for station, station_lines in stations.items():
+                content = b"".join(header + station_lines)
+                info = tarfile.TarInfo(
+                    f"SDA/19930101_20240101_{station.decode()}.ONEILL_lev20"
+                )
+                info.size = len(content)
+                tf.addfile(info, io.BytesIO(content))
+        with open(os.path.join(cls.tmpdir.name, "sda.csv"), "wb") as fh:
+            fh.writelines(lines)
+        handler = functools.partial(
+            http.server.SimpleHTTPRequestHandler, directory=cls.tmpdir.name
+        )
+        handler.log_message = lambda *args: None
+        cls.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.tmpdir.cleanup()
+
     def external_resource_available(self, url):
         try:
             req = urllib.request.Request(TEST_URL, method="HEAD")
@@ -147,6 +197,319 @@ class TestAERONETTimeSeriesReader(unittest.TestCase):
         ) as ts:
             self.assertEqual(ts.data(new_var_name).variable, new_var_name)
 
+    def test_local_server(self):
+        engine = pyaro.list_timeseries_engines()["aeronetsdareader"]
+        with engine.open(self.file, filters=[]) as ts:
+            expected = ts.data("AOD_550nm")
+        for name in ("sda.csv", "sda.csv.zip", "sda.tar.gz"):
+            with engine.open(
+                f"{self.url}/{name}", filters=[], tqdm_desc=f"test_sda_{name}"
+            ) as ts:
+                count = 0
+                for var in ts.variables():
+                    count += len(ts.data(var))
+                self.assertEqual(count, 79944)
+                self.assertEqual(len(ts.stations()), 4)
+                data = ts.data("AOD_550nm")
+                for key in data.keys():
+                    np.testing.assert_array_equal(data[key], expected[key])
+
+    def test_open_async(self):
+        engine = pyaro.list_timeseries_engines()["aeronetsdareader"]
+        with engine.open(self.file, filters=[]) as ts:
+            expected = ts.data("AOD_550nm")
+        names = ("sda.csv", "sda.csv.zip", "sda.tar.gz")
+
+        async def open_all():
+            return await asyncio.gather(
+                *(engine.open_async(f"{self.url}/{name}", filters=[]) for name in names)
+            )
+
+        for ts in asyncio.run(open_all()):
+            with ts:
+                data = ts.data("AOD_550nm")
+                for key in data.keys():
+                    np.testing.assert_array_equal(data[key], expected[key])
+
+    def test_open_async_cancel(self):
+        engine = pyaro.list_timeseries_engines()["aeronetsdareader"]
+        events = []
+        started = threading.Event()
+
+        def callback(*args):
+            events.append(args)
+            started.set()
+
+        async def cancel():
+            task = asyncio.create_task(
+                engine.open_async(
+                    f"{self.url}/sda.tar.gz", filters=[], stats_callback=callback
+                )
+            )
+            while not started.is_set():
+                await asyncio.sleep(0.001)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel())
+        # the opening stopped before assembling the data
+        self.assertNotIn("assemble", [name for _, name, _ in events])
+
+    def test_resume_download(self):
+        with open(self.file, "rb") as fh:
+            content = fh.read()
+        ranges = []
+
+        class FlakyHandler(http.server.BaseHTTPRequestHandler):
+            # drops the connection in the middle of the first response
+            def do_GET(self):
+                ranges.append(self.headers.get("Range"))
+                start = 0
+                if self.headers.get("Range"):
+                    start = int(self.headers["Range"][6:].split("-")[0])
+                    self.send_response(206)
+                    self.send_header(
+                        "Content-Range",
+                        f"bytes {start}-{len(content) - 1}/{len(content)}",
+                    )
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Length", str(len(content) - start))
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("ETag", '"v1"')
+                self.end_headers()
+                if len(ranges) == 1:
+                    self.wfile.write(content[: len(content) // 2])
+                    self.close_connection = True
+                else:
+                    self.wfile.write(content[start:])
+
+            def log_message(self, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            engine = pyaro.list_timeseries_engines()["aeronetsdareader"]
+            url = f"http://127.0.0.1:{server.server_address[1]}/sda.csv"
+            with engine.open(url, filters=[]) as ts:
+                self.assertEqual(len(ts.data("AOD_550nm")), 9993)
+        finally:
+            server.shutdown()
+            server.server_close()
+        # resumed after the bytes already read
+        self.assertEqual(len(ranges), 2)
+        self.assertIsNone(ranges[0])
+        resumed = int(ranges[1][6:].split("-")[0])
+        self.assertGreater(resumed, 0)
+        self.assertLessEqual(resumed, len(content) // 2)
+
+    def test_parallel_tar(self):
+        engine = pyaro.list_timeseries_engines()["aeronetsdareader"]
+        with engine.open(f"{self.url}/sda.tar.gz", filters=[]) as ts_serial:
+            # lazy reading spools the lines returned by the workers
+            for kwargs in ({}, {"lazy": True}):
+                with engine.open(
+                    f"{self.url}/sda.tar.gz",
+                    filters=[],
+                    max_workers=2,
+                    tqdm_desc="test_sda_parallel_tar",
+                    **kwargs,
+                ) as ts:
+                    self.assertEqual(len(ts.stations()), 4)
+                    self.assertEqual(ts.variables(), ts_serial.variables())
+                    for var in ts.variables():
+                        data = ts.data(var)
+                        data_serial = ts_serial.data(var)
+                        for key in data.keys():
+                            np.testing.assert_array_equal(data[key], data_serial[key])
+        # without spool only the number of lines is sent back from the workers
+        with open(self.file, "rb") as fh:
+            content = fh.read()
+        fields = content.splitlines()[6].decode().split(",")
+        args = (content, 7, fields, ["AERONET_Site_Name"], [], "numpy")
+        lines, _, _ = pyaro_readers.utils.aeronet._read_member(*args)
+        self.assertEqual(lines, 9993)
+        lines, _, _ = pyaro_readers.utils.aeronet._read_member(*args, keep_lines=True)
+        self.assertEqual(len(lines), 9993)
+
+    def test_cache_tar(self):
+        source = f"{self.url}/sda.tar.gz"
+        engine = pyaro.list_timeseries_engines()["aeronetsdareader"]
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with engine.open(source, filters=[], cache_dir=cache_dir) as ts:
+                expected = {var: ts.data(var) for var in ts.variables()}
+                stations = ts.stations()
+            # second open must not download and parse the archive again
+            with unittest.mock.patch(
+                "pyaro_readers.utils.aeronet.read_file",
+                side_effect=AssertionError("cache not used"),
+            ):
+                with engine.open(source, filters=[], cache_dir=cache_dir) as ts:
+                    self.assertEqual(ts.variables(), list(expected.keys()))
+                    self.assertEqual(ts.stations().keys(), stations.keys())
+                    for var, data in expected.items():
+                        for key in data.keys():
+                            np.testing.assert_array_equal(ts.data(var)[key], data[key])
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+    def test_backends(self):
+        engine = pyaro.list_timeseries_engines()["aeronetsdareader"]
+        backends = ["csv", "auto"]
+        if pyaro_readers.utils.aeronet.pyarrow is not None:
+            backends.append("arrow")
+        with engine.open(
+            self.file, filters=[], backend="numpy", tqdm_desc="test_sda_backends"
+        ) as ts:
+            for backend in backends:
+                with engine.open(
+                    self.file,
+                    filters=[],
+                    backend=backend,
+                    tqdm_desc="test_sda_backends",
+                ) as ts_backend:
+                    self.assertEqual(ts.variables(), ts_backend.variables())
+                    self.assertEqual(ts.stations().keys(), ts_backend.stations().keys())
+                    for var in ts.variables():
+                        data = ts.data(var)
+                        data_backend = ts_backend.data(var)
+                        for key in data.keys():
+                            np.testing.assert_array_equal(data[key], data_backend[key])
+
+    @unittest.skipUnless(
+        pyaro_readers.utils.aeronet.pyarrow is not None,
+        "needs the arrow extra, pip install .[arrow]",
+    )
+    def test_arrow_archives(self):
+        # zip-files are streamed to pyarrow, tar-archives parsed per station file
+        engine = pyaro.list_timeseries_engines()["aeronetsdareader"]
+        station = pyaro.timeseries.filters.get("stations", include=["Alta_Floresta"])
+        for source in (f"{self.url}/sda.csv.zip", f"{self.url}/sda.tar.gz"):
+            for kwargs in (
+                {},
+                {"chunk_rows": 500},
+                {"lazy": True},
+                {"filters": [station]},
+            ):
+                kwargs = {"filters": [], **kwargs}
+                with self.subTest(source=source, kwargs=kwargs):
+                    with engine.open(source, backend="numpy", **kwargs) as ts:
+                        with engine.open(source, backend="arrow", **kwargs) as ts_arrow:
+                            self.assertEqual(ts.variables(), ts_arrow.variables())
+                            self.assertEqual(
+                                ts.stations().keys(), ts_arrow.stations().keys()
+                            )
+                            for var in ts.variables():
+                                data = ts.data(var)
+                                data_arrow = ts_arrow.data(var)
+                                for key in data.keys():
+                                    np.testing.assert_array_equal(
+                                        data[key], data_arrow[key]
+                                    )
+
+    def test_chunk_rows(self):
+        engine = pyaro.list_timeseries_engines()["aeronetsdareader"]
+        with engine.open(self.file, filters=[]) as ts:
+            expected = {var: ts.data(var) for var in ts.variables()}
+        for kwargs in ({}, {"lazy": True}, {"compact": True}):
+            with engine.open(self.file, filters=[], chunk_rows=1000, **kwargs) as ts:
+                self.assertEqual(len(ts.stations()), 4)
+                for var, data in expected.items():
+                    cdata = ts.data(var)
+                    for key in data.keys():
+                        np.testing.assert_array_equal(cdata[key], data[key])
+
+    def test_computed_vars(self):
+        engine = pyaro.list_timeseries_engines()["aeronetsdareader"]
+        with engine.open(
+            self.file, filters=[], tqdm_desc="test_sda_computed_vars"
+        ) as ts:
+            for var, ref in (
+                ("AOD_550nm", "Total_AOD_500nm[tau_a]"),
+                ("AODGT1_550nm", "Coarse_Mode_AOD_500nm[tau_c]"),
+                ("AODLT1_550nm", "Fine_Mode_AOD_500nm[tau_f]"),
+            ):
+                expected = ts.compute_od_from_angstromexp(
+                    0.55,
+                    ts.data(ref).values.astype("f8"),
+                    0.50,
+                    ts.data("Angstrom_Exponent(AE)-Total_500nm[alpha]").values,
+                )
+                np.testing.assert_allclose(
+                    ts.data(var).values, expected, rtol=1e-5, equal_nan=True
+                )
+
+    def test_lazy(self):
+        engine = pyaro.list_timeseries_engines()["aeronetsdareader"]
+        with engine.open(self.file, filters=[]) as ts:
+            expected = {var: ts.data(var) for var in ts.variables()}
+        for source in (self.file, f"{self.url}/sda.tar.gz"):
+            with engine.open(
+                source, filters=[], lazy=True, tqdm_desc="test_sda_lazy"
+            ) as ts:
+                self.assertEqual(ts.variables(), list(expected.keys()))
+                self.assertEqual(len(ts.stations()), 4)
+                # nothing parsed before first access
+                self.assertEqual(len(ts._data), 0)
+                self.assertEqual(len(ts.data("AOD_550nm")), 9993)
+                self.assertEqual(list(ts._data.keys()), ["AOD_550nm"])
+                for var, data in expected.items():
+                    for key in data.keys():
+                        np.testing.assert_array_equal(ts.data(var)[key], data[key])
+
+    def test_filter_pushdown_tar(self):
+        engine = pyaro.list_timeseries_engines()["aeronetsdareader"]
+        filters = [
+            pyaro.timeseries.filters.get(
+                "time_bounds",
+                startend_include=[("2010-01-01 00:00:00", "2012-12-31 23:59:59")],
+            ),
+            pyaro.timeseries.filters.get(
+                "bounding_boxes", include=[(0.0, -50.0, -20.0, -60.0)]
+            ),
+            pyaro.timeseries.filters.get("stations", exclude=["Cuiaba"]),
+        ]
+        with engine.open(self.file, filters=[]) as ts_all:
+            with engine.open(
+                f"{self.url}/sda.tar.gz",
+                filters=filters,
+                tqdm_desc="test_sda_filter_pushdown_tar",
+            ) as ts:
+                # lines outside of the filters are not parsed at all
+                self.assertLess(len(ts._rows["stations"]), 1000)
+                self.assertEqual(list(ts.stations().keys()), ["Alta_Floresta"])
+                collection = pyaro.timeseries.Filter.FilterCollection(filters)
+                for var in ts.variables():
+                    data = ts.data(var)
+                    expected = collection.filter(ts_all, var)
+                    self.assertGreater(len(data), 0)
+                    for key in data.keys():
+                        np.testing.assert_array_equal(data[key], expected[key])
+
+    def test_country_cache(self):
+        engine = pyaro.list_timeseries_engines()["aeronetsdareader"]
+        with tempfile.TemporaryDirectory() as cache_home:
+            with unittest.mock.patch.dict(os.environ, {"XDG_CACHE_HOME": cache_home}):
+                with engine.open(self.file, filters=[], fill_country_flag=True) as ts:
+                    countries = {
+                        name: station.country for name, station in ts.stations().items()
+                    }
+                self.assertEqual(countries["Cuiaba"], "BR")
+                cache_file = pyaro_readers.utils.geocoding.default_cache_file()
+                self.assertTrue(os.path.exists(cache_file))
+                # second run uses the persistent cache, no geocoder needed
+                pyaro_readers.utils.geocoding._memory.clear()
+                with unittest.mock.patch(
+                    "pyaro_readers.utils.geocoding._get_geocoder",
+                    side_effect=AssertionError("geocoding cache not used"),
+                ):
+                    with engine.open(
+                        self.file, filters=[], fill_country_flag=True
+                    ) as ts:
+                        for name, station in ts.stations().items():
+                            self.assertEqual(station.country, countries[name])
+
 
 if __name__ == "__main__":
     unittest.main()
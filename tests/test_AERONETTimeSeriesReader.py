@@ -1,9 +1,16 @@
+import functools
+import http.server
+import tempfile
+import threading
 import unittest
 import urllib.request
 import os
+import zipfile
 
+import numpy as np
 import pyaro
 import pyaro.timeseries
+import pyaro_readers.utils.aeronet
 from pyaro.timeseries.Wrappers import VariableNameChangingReader
 
 TEST_URL = "https://pyaerocom.met.no/pyaro-suppl/testdata/aeronetsun_testdata.csv"
@@ -19,6 +26,33 @@ class TestAERONETTimeSeriesReader(unittest.TestCase):
         "testdata",
         "aeronetsun_testdata.csv",
     )
+    small_file = os.path.join(
+        os.path.dirname(os.path.realpath(__file__)),
+        "testdata",
+        "aeronetsun_testdata_small.csv",
+    )
+
+    @classmethod
+    def setUpClass(cls):
+        # serve the small test-file zipped from a local http-server
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        with zipfile.ZipFile(
+            os.path.join(cls.tmpdir.name, "sun.csv.zip"), "w", zipfile.ZIP_DEFLATED
+        ) as zf:
+            zf.write(cls.small_file, "sun.csv")
+        handler = functools.partial(
+            http.server.SimpleHTTPRequestHandler, directory=cls.tmpdir.name
+        )
+        handler.log_message = lambda *args: None
+        cls.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.tmpdir.cleanup()
 
     def external_resource_available(self, url):
         try:
@@ -127,6 +161,61 @@ class TestAERONETTimeSeriesReader(unittest.TestCase):
         ) as ts:
             self.assertEqual(ts.data(new_var_name).variable, new_var_name)
 
+    def test_local_server(self):
+        engine = pyaro.list_timeseries_engines()["aeronetsunreader"]
+        with engine.open(self.small_file, filters=[]) as ts:
+            expected = ts.data("AOD_550nm")
+        with engine.open(
+            f"{self.url}/sun.csv.zip", filters=[], tqdm_desc="test_local_server"
+        ) as ts:
+            self.assertEqual(len(ts.stations()), 3)
+            data = ts.data("AOD_550nm")
+            for key in data.keys():
+                np.testing.assert_array_equal(data[key], expected[key])
+
+    def test_backends(self):
+        engine = pyaro.list_timeseries_engines()["aeronetsunreader"]
+        backends = ["csv", "auto"]
+        if pyaro_readers.utils.aeronet.pyarrow is not None:
+            backends.append("arrow")
+        with engine.open(
+            self.small_file, filters=[], backend="numpy", tqdm_desc="test_backends"
+        ) as ts:
+            self.assertEqual(len(ts.stations()), 3)
+            for backend in backends:
+                with engine.open(
+                    self.small_file,
+                    filters=[],
+                    backend=backend,
+                    tqdm_desc="test_backends",
+                ) as ts_backend:
+                    self.assertEqual(ts.variables(), ts_backend.variables())
+                    self.assertEqual(ts.stations().keys(), ts_backend.stations().keys())
+                    for name, station in ts.stations().items():
+                        self.assertEqual(
+                            station.latitude, ts_backend.stations()[name].latitude
+                        )
+                    for var in ts.variables():
+                        data = ts.data(var)
+                        data_backend = ts_backend.data(var)
+                        self.assertEqual(len(data), 120)
+                        for key in data.keys():
+                            np.testing.assert_array_equal(data[key], data_backend[key])
+        with self.assertRaises(Exception):
+            engine.open(self.small_file, filters=[], backend="unknown")
+
+    def test_lazy(self):
+        engine = pyaro.list_timeseries_engines()["aeronetsunreader"]
+        with engine.open(self.small_file, filters=[]) as ts:
+            expected = {var: ts.data(var) for var in ts.variables()}
+        for source in (self.small_file, f"{self.url}/sun.csv.zip"):
+            with engine.open(source, filters=[], lazy=True) as ts:
+                self.assertEqual(ts.variables(), list(expected.keys()))
+                self.assertEqual(len(ts._data), 0)
+                for var, data in expected.items():
+                    for key in data.keys():
+                        np.testing.assert_array_equal(ts.data(var)[key], data[key])
+
 
 if __name__ == "__main__":
     unittest.main()
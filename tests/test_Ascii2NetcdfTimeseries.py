@@ -1,9 +1,16 @@
+import asyncio
 import os
+import shutil
+import tempfile
 import unittest
+import unittest.mock
+
+import netCDF4
 import numpy as np
 
 import pyaro
 import pyaro.timeseries
+import pyaro_readers.ascii2netcdf.Ascii2NetcdfTimeseries
 
 EBAS_URL = file = os.path.join(
     os.path.dirname(os.path.realpath(__file__)), "testdata", "NILU"
@@ -48,3 +55,411 @@ class TestAscii2NetcdfTimeSeriesReader(unittest.TestCase):
             self.assertEqual(
                 len(data.values[data.values > 4]), 1
             )  # one day (21.05. with extreme SO2)
+
+
+STATIONS = ["AM0001", "AT0002", "XX9999", "NO0002", "AT0003", "AT0004"]
+COMPONENTS = [
+    ("sulphur_dioxide", "air", "ug"),
+    ("ozone", "air", "ug"),
+    ("sodium", "precip", "mg"),
+]
+# days between the times of a resolution
+STEPS = {"daily": 1, "weekly": 7}
+
+
+def create_database(directory, years=(2019, 2020, 2021), resolution="daily"):
+    """create a small database with random daily or weekly data, the station XX9999 is unknown
+
+    :return: dict of (variable, year) -> data-array [station][time], NaN for missing
+    """
+    shutil.copy(os.path.join(EBAS_URL, "StationList.csv"), directory)
+    rng = np.random.default_rng(1)
+    values = {}
+    for year in years:
+        days = np.arange(0, 366 if year % 4 == 0 else 365, STEPS[resolution])
+        file = os.path.join(directory, f"data_{resolution}.{year}.nc")
+        with netCDF4.Dataset(file, "w") as nc:
+            nc.createDimension("time", len(days))
+            nc.createDimension("station", len(STATIONS))
+            nc.createDimension("strlen", 8)
+            time = nc.createVariable("time", "f8", ("time",))
+            time.units = f"days since {year}-01-01 00:00:00"
+            time[:] = days
+            station = nc.createVariable("station", "S1", ("station", "strlen"))
+            station[:] = (
+                np.array(STATIONS, dtype="S8").view("S1").reshape(len(STATIONS), 8)
+            )
+            for i, (component, matrix, units) in enumerate(COMPONENTS):
+                if year == years[0] and matrix == "precip":
+                    continue
+                var = nc.createVariable(
+                    f"EPDL{i:03d}", "f4", ("station", "time"), fill_value=-9999.0
+                )
+                var.component = component
+                var.matrix = matrix
+                var.units = units
+                vals = (rng.random((len(STATIONS), len(days))) * 10).astype("f4")
+                vals[rng.random(vals.shape) < 0.3] = np.nan
+                var[:] = np.where(np.isnan(vals), -9999.0, vals)
+                values[(f"{component}_in_{matrix}", year)] = vals
+    return values
+
+
+class TestAscii2NetcdfDatabase(unittest.TestCase):
+    engine = "ascii2netcdf"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.directory = cls.tmpdir.name
+        cls.values = create_database(cls.directory)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def test_read(self):
+        with pyaro.open_timeseries(
+            self.engine, self.directory, resolution="daily", filters=[]
+        ) as ts:
+            self.assertEqual(len(ts.variables()), 3)
+            data = ts.data("sulphur_dioxide_in_air")
+            self.assertEqual(data.units, "ug")
+            self.assertNotIn("XX9999", data.stations)
+            known = [i for i, name in enumerate(STATIONS) if name != "XX9999"]
+            count = 0
+            for year in (2019, 2020, 2021):
+                count += np.isfinite(
+                    self.values[("sulphur_dioxide_in_air", year)][known]
+                ).sum()
+            self.assertEqual(len(data), count)
+
+            idx = data.stations == "NO0002"
+            self.assertEqual(data.latitudes[idx][0], ts.stations()["NO0002"].latitude)
+            expected = np.concatenate(
+                [
+                    self.values[("sulphur_dioxide_in_air", year)][
+                        STATIONS.index("NO0002")
+                    ]
+                    for year in (2019, 2020, 2021)
+                ]
+            )
+            expected = expected[np.isfinite(expected)]
+            np.testing.assert_array_equal(np.sort(data.values[idx]), np.sort(expected))
+
+    def test_time_units(self):
+        with tempfile.TemporaryDirectory() as directory:
+            create_database(directory, years=(2020,))
+            with pyaro.open_timeseries(
+                self.engine, directory, resolution="daily", filters=[]
+            ) as ts:
+                expected = ts.data("ozone_in_air")
+            # same times relative to a reference date before the gregorian reform
+            file = os.path.join(directory, "data_daily.2020.nc")
+            with netCDF4.Dataset(file, "a") as nc:
+                times = netCDF4.num2date(nc["time"][:], nc["time"].units)
+                nc["time"].units = "days since 0001-01-01 00:00:00"
+                nc["time"][:] = netCDF4.date2num(times, nc["time"].units)
+            pyaro_readers.ascii2netcdf.Ascii2NetcdfTimeseries._AXIS_CACHE.clear()
+            with pyaro.open_timeseries(
+                self.engine, directory, resolution="daily", filters=[]
+            ) as ts:
+                data = ts.data("ozone_in_air")
+            for key in expected.keys():
+                np.testing.assert_array_equal(data[key], expected[key])
+
+    def test_station_rows(self):
+        file = os.path.join(self.directory, "data_daily.2020.nc")
+        with netCDF4.Dataset(file) as nc:
+            axes = pyaro_readers.ascii2netcdf.Ascii2NetcdfTimeseries._Axes(nc)
+        names = np.sort(np.array(STATIONS))
+        lats = np.ones(len(names))
+        rows, _ = axes.station_rows(names, lats)
+        self.assertEqual(len(rows), len(STATIONS))
+        # the rows depend on the known coordinates, too
+        lats[0] = np.nan
+        rows, _ = axes.station_rows(names, lats)
+        self.assertEqual(len(rows), len(STATIONS) - 1)
+
+    def test_index(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with tempfile.TemporaryDirectory() as cache_home, unittest.mock.patch.dict(
+                os.environ, {"XDG_CACHE_HOME": cache_home}
+            ):
+                sidecar = os.path.join(directory, ".pyaro_index_daily.json")
+                create_database(directory)
+                with pyaro.open_timeseries(
+                    self.engine, directory, resolution="daily", filters=[]
+                ) as ts:
+                    variables = ts.variables()
+                # the index is written to the user cache, not into the database
+                self.assertFalse(os.path.exists(sidecar))
+                cache = os.path.join(cache_home, "pyaro_readers", "ascii2netcdf")
+                self.assertEqual(len(os.listdir(cache)), 1)
+                # reopening does not open the data-files for metadata
+                with unittest.mock.patch(
+                    "pyaro_readers.ascii2netcdf.Ascii2NetcdfTimeseries.netCDF4.Dataset",
+                    side_effect=AssertionError("index not used"),
+                ):
+                    with pyaro.open_timeseries(
+                        self.engine, directory, resolution="daily", filters=[]
+                    ) as ts:
+                        self.assertEqual(ts.variables(), variables)
+                # changed files are refreshed, the first year of a database has no precip
+                os.remove(os.path.join(directory, "data_daily.2021.nc"))
+                create_database(directory, years=(2020,))
+                with pyaro.open_timeseries(
+                    self.engine, directory, resolution="daily", filters=[]
+                ) as ts:
+                    self.assertNotIn("sodium_in_precip", ts.variables())
+                # opt-in sidecar in the database directory, written with the next update
+                os.remove(os.path.join(directory, "data_daily.2020.nc"))
+                create_database(directory, years=(2020,))
+                with pyaro.open_timeseries(
+                    self.engine,
+                    directory,
+                    resolution="daily",
+                    filters=[],
+                    index_in_data_dir=True,
+                ) as ts:
+                    self.assertNotIn("sodium_in_precip", ts.variables())
+                self.assertTrue(os.path.exists(sidecar))
+
+    def test_index_read_only(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with tempfile.TemporaryDirectory() as cache_home:
+                create_database(directory)
+                with pyaro.open_timeseries(
+                    self.engine,
+                    directory,
+                    resolution="daily",
+                    filters=[],
+                    index_in_data_dir=True,
+                ) as ts:
+                    self.assertIn("sodium_in_precip", ts.variables())
+                # the database changes and the directory with the sidecar index becomes
+                # read-only, mkstemp is patched as root may write anyway
+                os.remove(os.path.join(directory, "data_daily.2021.nc"))
+                create_database(directory, years=(2020,))
+                mkstemp = tempfile.mkstemp
+
+                def read_only_mkstemp(*args, dir=None, **kwargs):
+                    if dir == directory:
+                        raise PermissionError(f"read-only directory {dir}")
+                    return mkstemp(*args, dir=dir, **kwargs)
+
+                os.chmod(directory, 0o555)
+                try:
+                    with unittest.mock.patch.dict(
+                        os.environ, {"XDG_CACHE_HOME": cache_home}
+                    ), unittest.mock.patch(
+                        "pyaro_readers.ascii2netcdf.Ascii2NetcdfTimeseries.tempfile.mkstemp",
+                        side_effect=read_only_mkstemp,
+                    ):
+                        with pyaro.open_timeseries(
+                            self.engine,
+                            directory,
+                            resolution="daily",
+                            filters=[],
+                            index_in_data_dir=True,
+                        ) as ts:
+                            self.assertNotIn("sodium_in_precip", ts.variables())
+                        self.assertEqual(len(os.listdir(cache_home)), 1)
+                        # the refreshed index in the user cache wins over the stale sidecar
+                        with unittest.mock.patch(
+                            "pyaro_readers.ascii2netcdf.Ascii2NetcdfTimeseries.netCDF4.Dataset",
+                            side_effect=AssertionError("stale index used"),
+                        ):
+                            with pyaro.open_timeseries(
+                                self.engine,
+                                directory,
+                                resolution="daily",
+                                filters=[],
+                                index_in_data_dir=True,
+                            ) as ts:
+                                self.assertNotIn("sodium_in_precip", ts.variables())
+                finally:
+                    os.chmod(directory, 0o755)
+
+    def test_parallel(self):
+        with pyaro.open_timeseries(
+            self.engine, self.directory, resolution="daily", filters=[]
+        ) as ts:
+            expected = {var: ts.data(var) for var in ts.variables()}
+        for executor in ("process", "thread"):
+            with pyaro.open_timeseries(
+                self.engine,
+                self.directory,
+                resolution="daily",
+                filters=[],
+                max_workers=3,
+                executor=executor,
+            ) as ts:
+                for var, data in expected.items():
+                    pdata = ts.data(var)
+                    for key in data.keys():
+                        np.testing.assert_array_equal(pdata[key], data[key])
+
+    def test_hyperslab(self):
+        filters = [
+            pyaro.timeseries.filters.get("stations", include=["AM0001", "AT0004"]),
+            pyaro.timeseries.filters.get(
+                "time_bounds",
+                startend_include=[("2020-03-01 00:00:00", "2020-04-30 00:00:00")],
+            ),
+        ]
+        collection = pyaro.timeseries.Filter.FilterCollection(filters)
+        with pyaro.open_timeseries(
+            self.engine, self.directory, resolution="daily", filters=[]
+        ) as ts_all:
+            with pyaro.open_timeseries(
+                self.engine, self.directory, resolution="daily", filters=filters
+            ) as ts:
+                for var in ts.variables():
+                    data = ts.data(var)
+                    expected = collection.filter(ts_all, var)
+                    self.assertGreater(len(data), 0)
+                    self.assertEqual(set(data.stations), {"AM0001", "AT0004"})
+                    for key in data.keys():
+                        np.testing.assert_array_equal(data[key], expected[key])
+
+    def test_data_many(self):
+        filters = [
+            pyaro.timeseries.filters.get(
+                "variables", reader_to_new={"ozone_in_air": "conco3"}
+            ),
+        ]
+        with pyaro.open_timeseries(
+            self.engine, self.directory, resolution="daily", filters=filters
+        ) as ts:
+            variables = ts.variables()
+            self.assertIn("conco3", variables)
+            expected = {var: ts.data(var) for var in variables}
+            with unittest.mock.patch(
+                "pyaro_readers.ascii2netcdf.Ascii2NetcdfTimeseries.netCDF4.Dataset",
+                wraps=netCDF4.Dataset,
+            ) as dataset:
+                datas = ts.data_many(variables)
+                # each of the 3 files is opened once
+                self.assertEqual(dataset.call_count, 3)
+            self.assertEqual(list(datas.keys()), variables)
+            for var, data in expected.items():
+                self.assertEqual(datas[var].variable, data.variable)
+                for key in ("values", "stations", "start_times", "latitudes"):
+                    np.testing.assert_array_equal(
+                        getattr(datas[var], key), getattr(data, key)
+                    )
+
+    def test_axis_cache(self):
+        with pyaro.open_timeseries(
+            self.engine, self.directory, resolution="daily", filters=[]
+        ) as ts:
+            expected = ts.data("ozone_in_air")
+            self.assertEqual(expected.start_times.dtype, np.dtype("datetime64[s]"))
+            # axes of all files are decoded already
+            with unittest.mock.patch(
+                "pyaro_readers.ascii2netcdf.Ascii2NetcdfTimeseries.netCDF4.num2date",
+                side_effect=AssertionError("axis cache not used"),
+            ):
+                self.assertGreater(len(ts.data("sulphur_dioxide_in_air")), 0)
+                data = ts.data("ozone_in_air")
+                np.testing.assert_array_equal(data.start_times, expected.start_times)
+
+    def test_compact(self):
+        filters = [pyaro.timeseries.filters.get("stations", exclude=["AT0002"])]
+        with pyaro.open_timeseries(
+            self.engine, self.directory, resolution="daily", filters=filters
+        ) as ts:
+            expected = {var: ts.data(var) for var in ts.variables()}
+        with pyaro.open_timeseries(
+            self.engine,
+            self.directory,
+            resolution="daily",
+            filters=filters,
+            compact=True,
+        ) as ts:
+            for var, data in expected.items():
+                cdata = ts.data(var)
+                self.assertIn("station_ids", cdata.keys())
+                for key in data.keys():
+                    np.testing.assert_array_equal(cdata[key], data[key])
+
+    def test_stats(self):
+        with pyaro.open_timeseries(
+            self.engine, self.directory, resolution="daily", filters=[]
+        ) as ts:
+            data = ts.data_many(ts.variables())
+            stats = ts.stats.as_dict()
+        self.assertEqual(
+            stats["counters"]["rows"], sum(len(da) for da in data.values())
+        )
+        self.assertGreater(stats["counters"]["bytes_read"], 0)
+        for phase in ("netcdf_open", "netcdf_read", "assemble", "filter"):
+            self.assertIn(phase, stats["timings"])
+
+    def test_open_async(self):
+        engine = pyaro.list_timeseries_engines()[self.engine]
+        ts = asyncio.run(
+            engine.open_async(self.directory, resolution="daily", filters=[])
+        )
+        with ts:
+            self.assertEqual(len(ts.variables()), 3)
+            self.assertGreater(len(ts.data("sulphur_dioxide_in_air")), 0)
+
+    def test_aggregate(self):
+        with pyaro.open_timeseries(
+            self.engine, self.directory, resolution="daily", filters=[]
+        ) as ts:
+            data = ts.data("sulphur_dioxide_in_air")
+        months = data.start_times.astype("datetime64[M]")
+        for compact in (False, True):
+            with pyaro.open_timeseries(
+                self.engine,
+                self.directory,
+                resolution="daily",
+                filters=[],
+                aggregate="monthly",
+                compact=compact,
+            ) as ts:
+                adata = ts.data("sulphur_dioxide_in_air")
+                self.assertIn("aggregate", ts.stats.as_dict()["timings"])
+            self.assertEqual(len(adata), len(set(zip(data.stations, months))))
+            for i in range(len(adata)):
+                idx = (data.stations == adata.stations[i]) & (
+                    months == adata.start_times[i]
+                )
+                self.assertAlmostEqual(
+                    adata.values[i], data.values[idx].astype("f8").mean(), places=5
+                )
+
+    def test_aggregate_across_years(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # the last week of 2019 starts on 2019-12-31 and belongs to January 2020
+            create_database(directory, years=(2019, 2020), resolution="weekly")
+            with pyaro.open_timeseries(
+                self.engine, directory, resolution="weekly", filters=[]
+            ) as ts:
+                data = ts.data("ozone_in_air")
+            middles = data.start_times + (data.end_times - data.start_times) // 2
+            months = middles.astype("datetime64[M]")
+            for compact in (False, True):
+                with pyaro.open_timeseries(
+                    self.engine,
+                    directory,
+                    resolution="weekly",
+                    filters=[],
+                    aggregate="monthly",
+                    aggregate_method="count",
+                    compact=compact,
+                    max_workers=2,
+                ) as ts:
+                    adata = ts.data("ozone_in_air")
+                periods = list(zip(adata.stations, adata.start_times))
+                # each station and month once, with all weeks of the month
+                self.assertEqual(len(periods), len(set(periods)))
+                self.assertEqual(len(adata), len(set(zip(data.stations, months))))
+                for i in range(len(adata)):
+                    idx = (data.stations == adata.stations[i]) & (
+                        months == adata.start_times[i]
+                    )
+                    self.assertEqual(adata.values[i], idx.sum())
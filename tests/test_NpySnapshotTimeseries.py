@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pyaro
+import pyaro.timeseries
+
+from pyaro_readers.npysnapshot import write_snapshot
+
+TEST_FILE = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)),
+    "testdata",
+    "aeronetsda_testdata.csv",
+)
+
+
+class TestNpySnapshotTimeseriesReader(unittest.TestCase):
+    engine = "npysnapshot"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.directory = cls.tmpdir.name
+        with pyaro.open_timeseries(
+            "aeronetsdareader", TEST_FILE, filters=[], fill_country_flag=False
+        ) as ts:
+            write_snapshot(ts, cls.directory)
+            cls.stations = ts.stations()
+            cls.expected = {var: ts.data(var) for var in ts.variables()}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def test_0engine(self):
+        self.assertIn(self.engine, pyaro.list_timeseries_engines())
+
+    def test_read(self):
+        with pyaro.open_timeseries(self.engine, self.directory, filters=[]) as ts:
+            self.assertEqual(ts.variables(), list(self.expected.keys()))
+            self.assertEqual(ts.stations().keys(), self.stations.keys())
+            for var, expected in self.expected.items():
+                data = ts.data(var)
+                self.assertIsInstance(data.values, np.memmap)
+                self.assertEqual(data.units, expected.units)
+                self.assertEqual(len(data), len(expected))
+                for key in expected.keys():
+                    np.testing.assert_array_equal(data[key], expected[key])
+
+    def test_filter(self):
+        filters = [
+            pyaro.timeseries.filters.get("stations", include=["GSFC"]),
+            pyaro.timeseries.filters.get(
+                "time_bounds",
+                startend_include=[("2000-01-01 00:00:00", "2000-12-31 23:59:59")],
+            ),
+        ]
+        collection = pyaro.timeseries.Filter.FilterCollection(filters)
+        with pyaro.open_timeseries(self.engine, self.directory, filters=filters) as ts:
+            data = ts.data("AODGT1_550nm")
+            expected = self.expected["AODGT1_550nm"]
+            expected = collection.filter_data(expected, self.stations, [])
+            self.assertGreater(len(data), 0)
+            np.testing.assert_array_equal(data.values, expected.values)
+            np.testing.assert_array_equal(data.stations, expected.stations)
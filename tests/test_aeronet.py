@@ -0,0 +1,368 @@
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+import numpy as np
+import pyaro
+import pyaro.timeseries
+import pyaro_readers.utils.aeronet
+
+TESTDATA = os.path.join(os.path.dirname(os.path.realpath(__file__)), "testdata")
+# the Sun and SDA readers share their ingest in utils.aeronet, its tests run with both
+READERS = {
+    "aeronetsdareader": os.path.join(TESTDATA, "aeronetsda_testdata.csv"),
+    "aeronetsunreader": os.path.join(TESTDATA, "aeronetsun_testdata_small.csv"),
+}
+
+
+class TestAeronetTimeseriesReader(unittest.TestCase):
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for name, file in READERS.items():
+                engine = pyaro.list_timeseries_engines()[name]
+                with self.subTest(reader=name):
+                    with engine.open(file, filters=[], cache_dir=cache_dir) as ts:
+                        expected = {var: ts.data(var) for var in ts.variables()}
+                        stations = ts.stations()
+                    # second open must not parse the file again
+                    with unittest.mock.patch(
+                        "pyaro_readers.utils.aeronet.read_file",
+                        side_effect=AssertionError("cache not used"),
+                    ):
+                        with engine.open(file, filters=[], cache_dir=cache_dir) as ts:
+                            self.assertEqual(ts.variables(), list(expected.keys()))
+                            self.assertEqual(ts.stations().keys(), stations.keys())
+                            for var, data in expected.items():
+                                for key in data.keys():
+                                    np.testing.assert_array_equal(
+                                        ts.data(var)[key], data[key]
+                                    )
+            self.assertEqual(len(os.listdir(cache_dir)), len(READERS))
+
+    def test_cache_invalidation(self):
+        for name, source in READERS.items():
+            with self.subTest(reader=name), tempfile.TemporaryDirectory() as tmpdir:
+                engine = pyaro.list_timeseries_engines()[name]
+                file = os.path.join(tmpdir, "aeronet.csv")
+                with open(source) as fh:
+                    lines = fh.readlines()
+                with open(file, "w") as fh:
+                    fh.writelines(lines)
+                cache_dir = os.path.join(tmpdir, "cache")
+                with engine.open(file, filters=[], cache_dir=cache_dir) as ts:
+                    self.assertEqual(len(ts.data("AOD_550nm")), len(lines) - 7)
+                # changed source
+                with open(file, "w") as fh:
+                    fh.writelines(lines[:-10])
+                with engine.open(file, filters=[], cache_dir=cache_dir) as ts:
+                    self.assertEqual(len(ts.data("AOD_550nm")), len(lines) - 17)
+                # lru eviction keeps only the latest entry
+                with engine.open(
+                    source, filters=[], cache_dir=cache_dir, cache_max_bytes=1
+                ) as ts:
+                    pass
+                self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+    def test_filter_pushdown(self):
+        for name, file in READERS.items():
+            engine = pyaro.list_timeseries_engines()[name]
+            with engine.open(file, filters=[]) as ts_all:
+                stations = ts_all.stations()
+                site = sorted(stations)[-1]
+                lat, lon = stations[site].latitude, stations[site].longitude
+                times = np.sort(ts_all.data(ts_all.variables()[0]).start_times)
+                middle = str(times[len(times) // 2].astype("datetime64[s]"))
+                time_bounds = pyaro.timeseries.filters.get(
+                    "time_bounds",
+                    startend_include=[
+                        (middle.replace("T", " "), "2100-01-01 00:00:00")
+                    ],
+                )
+                for filters in (
+                    [pyaro.timeseries.filters.get("stations", include=[site])],
+                    [pyaro.timeseries.filters.get("stations", exclude=[site])],
+                    [
+                        pyaro.timeseries.filters.get(
+                            "bounding_boxes",
+                            include=[(lat + 1, lon + 1, lat - 1, lon - 1)],
+                        )
+                    ],
+                    [time_bounds],
+                ):
+                    with self.subTest(reader=name, filters=filters):
+                        with engine.open(file, filters=filters) as ts:
+                            collection = pyaro.timeseries.Filter.FilterCollection(
+                                filters
+                            )
+                            for var in ts.variables():
+                                data = ts.data(var)
+                                expected = collection.filter(ts_all, var)
+                                self.assertGreater(len(data), 0)
+                                self.assertLess(len(data), len(ts_all.data(var)))
+                                for key in data.keys():
+                                    np.testing.assert_array_equal(
+                                        data[key], expected[key]
+                                    )
+
+    def test_filter_pushdown_empty(self):
+        filters = (
+            [pyaro.timeseries.filters.get("stations", include=["Nope"])],
+            [
+                pyaro.timeseries.filters.get(
+                    "time_bounds",
+                    startend_include=[("1900-01-01 00:00:00", "1900-12-31 00:00:00")],
+                )
+            ],
+            [
+                pyaro.timeseries.filters.get(
+                    "bounding_boxes", include=[(89.0, -178.0, 88.0, -179.0)]
+                )
+            ],
+        )
+        for name, file in READERS.items():
+            engine = pyaro.list_timeseries_engines()[name]
+            with engine.open(file, filters=[]) as ts_all:
+                variables = ts_all.variables()
+            for kwargs in ({}, {"lazy": True}, {"compact": True}):
+                for nothing in filters:
+                    with self.subTest(reader=name, filters=nothing, **kwargs):
+                        with engine.open(file, filters=nothing, **kwargs) as ts:
+                            # all variables, without data
+                            self.assertEqual(ts.variables(), variables)
+                            self.assertEqual(len(ts.stations()), 0)
+                            for var in variables:
+                                self.assertEqual(len(ts.data(var)), 0)
+
+    def test_compact(self):
+        for name, file in READERS.items():
+            with self.subTest(reader=name), tempfile.TemporaryDirectory() as cache_dir:
+                engine = pyaro.list_timeseries_engines()[name]
+                with engine.open(file, filters=[]) as ts:
+                    expected = {var: ts.data(var) for var in ts.variables()}
+                for kwargs in (
+                    {"cache_dir": cache_dir},
+                    {"cache_dir": cache_dir},
+                    {"lazy": True},
+                ):
+                    # parsed, from cache and loaded lazily
+                    with engine.open(file, filters=[], compact=True, **kwargs) as ts:
+                        for var, data in expected.items():
+                            cdata = ts.data(var)
+                            self.assertIn("station_ids", cdata.keys())
+                            for key in data.keys():
+                                np.testing.assert_array_equal(cdata[key], data[key])
+
+    def test_stats(self):
+        for name, file in READERS.items():
+            with self.subTest(reader=name):
+                engine = pyaro.list_timeseries_engines()[name]
+                with open(file, "rb") as fh:
+                    lines = fh.readlines()[7:]
+                site = lines[-1].split(b",")[0]
+                filters = [
+                    pyaro.timeseries.filters.get("stations", include=[site.decode()])
+                ]
+                events = []
+                with engine.open(
+                    file,
+                    filters=filters,
+                    stats_callback=lambda *args: events.append(args),
+                ) as ts:
+                    data = ts.data("AOD_550nm")
+                    stats = ts.stats.as_dict()
+                site_rows = sum(line.startswith(site + b",") for line in lines)
+                self.assertEqual(len(data), site_rows)
+                # the lines of other stations are skipped before parsing
+                self.assertEqual(stats["counters"]["rows"], site_rows)
+                self.assertEqual(
+                    stats["counters"]["rows"] + stats["counters"]["dropped_rows"],
+                    len(lines),
+                )
+                # the pushed-down filters leave nothing to remove in data()
+                self.assertNotIn("filtered_rows", stats["counters"])
+                self.assertEqual(stats["counters"]["bytes_read"], os.path.getsize(file))
+                for phase in ("download", "decompress", "row_parse", "filter"):
+                    self.assertIn(phase, stats["timings"])
+                self.assertIn(("count", "rows", site_rows), events)
+                self.assertIn('phase="row_parse"', ts.stats.prometheus())
+
+                # filters applied to the parsed rows are counted on every data()-call
+                data_range = pyaro.timeseries.filters.get("data_range", minimum=0.1)
+                with engine.open(file, filters=[data_range]) as ts:
+                    removed = len(ts._unfiltered_data("AOD_550nm")) - len(
+                        ts.data("AOD_550nm")
+                    )
+                    self.assertGreater(removed, 0)
+                    ts.data("AOD_550nm")
+                    stats = ts.stats.as_dict()
+                self.assertEqual(stats["counters"]["filtered_rows"], 2 * removed)
+                self.assertEqual(stats["counters"]["rows"], len(lines))
+                self.assertNotIn("dropped_rows", stats["counters"])
+
+                # lazy loading parses the source again per variable, counted separately
+                with engine.open(file, filters=filters, lazy=True) as ts:
+                    for var in ts.variables():
+                        ts.data(var)
+                    stats = ts.stats.as_dict()
+                counters = stats["counters"]
+                self.assertEqual(counters["rows"], site_rows)
+                self.assertEqual(
+                    counters["rows"] + counters["dropped_rows"], len(lines)
+                )
+                self.assertEqual(counters["bytes_read"], os.path.getsize(file))
+                self.assertEqual(counters["lazy_rows"], len(ts.variables()) * site_rows)
+
+    def test_incremental(self):
+        for name, file in READERS.items():
+            with self.subTest(reader=name):
+                self._test_incremental(name, file)
+                # needs a cache_dir
+                engine = pyaro.list_timeseries_engines()[name]
+                with self.assertRaises(Exception):
+                    engine.open(file, filters=[], incremental=True)
+
+    def _test_incremental(self, name, source):
+        engine = pyaro.list_timeseries_engines()[name]
+        with engine.open(source, filters=[]) as ts:
+            expected = {var: ts.data(var) for var in ts.variables()}
+        with open(source) as fh:
+            lines = fh.readlines()
+        header, lines = lines[:7], lines[7:]
+
+        # earlier version without the later half of the days and without the last site
+        def day(line):
+            date = line.split(",")[1]
+            return date[6:10] + date[3:5] + date[0:2]
+
+        middle = sorted(day(line) for line in lines)[len(lines) // 2]
+        last_site = lines[-1].split(",")[0]
+        old = [
+            line
+            for line in lines
+            if day(line) < middle and not line.startswith(f"{last_site},")
+        ]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file = os.path.join(tmpdir, "aeronet.csv")
+            cache_dir = os.path.join(tmpdir, "cache")
+            with open(file, "w") as fh:
+                fh.writelines(header + old)
+            with engine.open(
+                file, filters=[], cache_dir=cache_dir, incremental=True
+            ) as ts:
+                self.assertEqual(len(ts.data("AOD_550nm")), len(old))
+            with open(file, "w") as fh:
+                fh.writelines(header + lines)
+            for compact in (False, True):
+                with engine.open(
+                    file,
+                    filters=[],
+                    cache_dir=cache_dir,
+                    incremental=True,
+                    compact=compact,
+                ) as ts:
+                    stats = ts.stats.as_dict()
+                    for var, data in expected.items():
+                        idata = ts.data(var)
+                        self.assertEqual(len(idata), len(data))
+                        order = np.lexsort((idata.start_times, idata.stations))
+                        eorder = np.lexsort((data.start_times, data.stations))
+                        for key in data.keys():
+                            np.testing.assert_array_equal(
+                                idata[key][order], data[key][eorder]
+                            )
+                if not compact:
+                    # only the new lines and the last day of each earlier site are parsed,
+                    # the days already in the cache are removed again
+                    old_sites = len({line.split(",")[0] for line in old})
+                    counters = stats["counters"]
+                    self.assertEqual(
+                        counters["rows"], len(lines) - len(old) + old_sites
+                    )
+                    self.assertEqual(counters["filtered_rows"], old_sites)
+                    self.assertEqual(
+                        counters["rows"] + counters["dropped_rows"], len(lines)
+                    )
+                else:
+                    # unchanged source: read from cache
+                    self.assertNotIn("rows", stats["counters"])
+
+    def test_aggregate(self):
+        for name, file in READERS.items():
+            engine = pyaro.list_timeseries_engines()[name]
+            with engine.open(file, filters=[]) as ts:
+                data = ts.data("AOD_550nm")
+            months = (data.start_times + np.timedelta64(12, "h")).astype(
+                "datetime64[M]"
+            )
+            valid = np.isfinite(data.values)
+            for method, func in (
+                ("mean", np.mean),
+                ("median", np.median),
+                ("count", len),
+            ):
+                for compact in (False, True):
+                    with self.subTest(reader=name, method=method, compact=compact):
+                        with engine.open(
+                            file,
+                            filters=[],
+                            aggregate="monthly",
+                            aggregate_method=method,
+                            compact=compact,
+                        ) as ts:
+                            adata = ts.data("AOD_550nm")
+                        self.assertEqual(
+                            len(adata),
+                            len(set(zip(data.stations[valid], months[valid]))),
+                        )
+                        for i in range(0, len(adata), max(1, len(adata) // 20)):
+                            station, month = adata.stations[i], adata.start_times[i]
+                            self.assertEqual(
+                                adata.end_times[i], month.astype("datetime64[M]") + 1
+                            )
+                            idx = (data.stations == station) & (months == month) & valid
+                            self.assertAlmostEqual(
+                                adata.values[i],
+                                func(data.values[idx].astype("f8")),
+                                places=5,
+                            )
+            with self.assertRaises(Exception):
+                engine.open(file, filters=[], aggregate="weekly")
+
+    @unittest.skipUnless(
+        pyaro_readers.utils.aeronet.pyarrow is not None,
+        "needs the arrow extra, pip install .[arrow]",
+    )
+    def test_arrow(self):
+        station = pyaro.timeseries.filters.get(
+            "stations", include=["Alta_Floresta", "Cuiaba"]
+        )
+        cases = (
+            {},
+            {"chunk_rows": 500},
+            {"lazy": True},
+            {"filters": [station]},
+            {"ts_type": "instantaneous"},
+        )
+        for name, file in READERS.items():
+            engine = pyaro.list_timeseries_engines()[name]
+            for kwargs in cases:
+                kwargs = {"filters": [], **kwargs}
+                with self.subTest(reader=name, kwargs=kwargs):
+                    with engine.open(file, backend="numpy", **kwargs) as ts:
+                        with engine.open(file, backend="arrow", **kwargs) as ts_arrow:
+                            self.assertEqual(ts.variables(), ts_arrow.variables())
+                            self.assertEqual(
+                                ts.stations().keys(), ts_arrow.stations().keys()
+                            )
+                            for var in ts.variables():
+                                data = ts.data(var)
+                                data_arrow = ts_arrow.data(var)
+                                for key in data.keys():
+                                    np.testing.assert_array_equal(
+                                        data[key], data_arrow[key]
+                                    )
+
+
+if __name__ == "__main__":
+    unittest.main()